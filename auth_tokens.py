@@ -0,0 +1,137 @@
+# auth_tokens.py - stateless HMAC-signed session tokens + a TTL cache of the users they name
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import event
+
+from database import User
+
+SESSION_COOKIE = "lexconnect_session"
+SESSION_TTL_SECS = 86400          # token lifetime (also the cookie max-age)
+USER_CACHE_TTL_SECS = 300         # bounds staleness across workers; local edits invalidate at once
+USER_CACHE_SIZE = 10000
+
+_secret = os.getenv("LEXCONNECT_SESSION_SECRET")
+if not _secret:
+    # fine for one worker; every worker behind a load balancer must share the same secret
+    print("⚠️ LEXCONNECT_SESSION_SECRET not set: using a random per-process key (sessions end on restart)")
+    _secret = secrets.token_urlsafe(32)
+SESSION_SECRET = _secret.encode()
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _digest(payload: str) -> bytes:
+    return hmac.new(SESSION_SECRET, payload.encode(), hashlib.sha256).digest()
+
+
+def _sign(payload: str) -> str:
+    return _b64(_digest(payload))
+
+
+def issue_token(user_id: int, role: str, ttl: int = SESSION_TTL_SECS) -> str:
+    """`<payload>.<signature>`; the payload carries uid, role and expiry, so checking it needs no shared state."""
+    payload = _b64(json.dumps({"uid": user_id, "role": role, "exp": int(time.time()) + ttl},
+                              separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token: Optional[str]) -> Optional[Dict]:
+    """The token's claims, or None if it is malformed, tampered with or expired."""
+    if not token or "." not in token:
+        return None
+    payload, signature = token.rsplit(".", 1)
+    try:
+        # bytes on both sides: compare_digest rejects non-ASCII str with TypeError
+        if not hmac.compare_digest(_unb64(signature), _digest(payload)):
+            return None
+        claims = json.loads(_unb64(payload))
+    except ValueError:  # bad base64 / non-ASCII / bad JSON
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return claims
+
+
+class CachedUser:
+    """Detached copy of the User fields the endpoints read."""
+    __slots__ = ("id", "name", "email", "phone", "role")
+
+    def __init__(self, id: int, name: str, email: str, phone: Optional[str], role: str):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.phone = phone
+        self.role = role
+
+
+class UserCache:
+    """LRU of CachedUser by id with a TTL; a hit costs no DB round trip."""
+
+    def __init__(self, ttl: float = USER_CACHE_TTL_SECS, max_size: int = USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._users: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, user_id: int) -> Optional[CachedUser]:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or entry[1] < time.time():
+                self.stats["misses"] += 1
+                return None
+            self._users.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def put(self, user: CachedUser) -> CachedUser:
+        with self._lock:
+            self._users[user.id] = (user, time.time() + self.ttl)
+            self._users.move_to_end(user.id)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+        return user
+
+    async def get_or_load(self, user_id: int, load: Callable) -> Optional[CachedUser]:
+        """`load` is an async callable returning the User row (or None) on a miss."""
+        user = self.get(user_id)
+        if user is None:
+            row = await load(user_id)
+            if row is not None:
+                user = self.put(CachedUser(row.id, row.name, row.email, row.phone, row.role.value))
+        return user
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            if self._users.pop(user_id, None) is not None:
+                self.stats["invalidations"] += 1
+
+    def status(self) -> Dict:
+        return {"users": len(self._users), **self.stats}
+
+
+user_cache = UserCache()
+
+
+def _invalidate_user(mapper, connection, target) -> None:
+    user_cache.invalidate(target.id)
+
+
+# profile edits / deletes through the ORM in this process drop the cached copy immediately
+event.listen(User, "after_update", _invalidate_user)
+event.listen(User, "after_delete", _invalidate_user)
@@ -0,0 +1,96 @@
+# bench_db_indexes.py - query plans + latency of the hot DB paths without and with the model indexes
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+from database import Base, migrate_indexes
+
+HOT_QUERIES = {
+    "pending requests (lawyer_id + status)":
+        "SELECT * FROM lawyer_recommendations WHERE lawyer_id = :lawyer AND status = 'client_accepted'",
+    "active cases (lawyer_id + status)":
+        "SELECT * FROM active_cases WHERE lawyer_id = :lawyer AND status = 'active'",
+    "client cases (client_id)":
+        "SELECT * FROM cases WHERE client_id = :client",
+    "recommendations of a case (case_id)":
+        "SELECT * FROM lawyer_recommendations WHERE case_id = :case",
+    "available lawyers (is_available)":
+        "SELECT * FROM lawyer_profiles WHERE is_available = 1",
+    "lawyer profile of a user (user_id)":
+        "SELECT * FROM lawyer_profiles WHERE user_id = :user",
+}
+REC_STATUSES = ["suggested", "client_accepted", "lawyer_accepted", "matched", "declined"]
+
+
+def seed(conn, n_recs: int, n_lawyers: int = 2000, n_clients: int = 20000, seed_value: int = 0) -> None:
+    rng = random.Random(seed_value)
+    n_cases = n_recs // 5
+    conn.execute(text("INSERT INTO users (id, email, name, password_hash, role) VALUES (:id, :e, :n, 'x', :r)"), [
+        {"id": i, "e": f"u{i}@bench", "n": f"User {i}", "r": "lawyer" if i <= n_lawyers else "client"}
+        for i in range(1, n_lawyers + n_clients + 1)
+    ])
+    conn.execute(text("INSERT INTO lawyer_profiles (id, user_id, specialization, is_available) VALUES (:id, :u, 'Civil Law', :a)"), [
+        {"id": i, "u": i, "a": int(rng.random() < 0.1)} for i in range(1, n_lawyers + 1)
+    ])
+    conn.execute(text("INSERT INTO cases (id, client_id, issue_type, description, status) VALUES (:id, :c, 'property', 'bench', 'open')"), [
+        {"id": i, "c": rng.randint(n_lawyers + 1, n_lawyers + n_clients)} for i in range(1, n_cases + 1)
+    ])
+    conn.execute(text("INSERT INTO lawyer_recommendations (case_id, lawyer_id, score, status) VALUES (:c, :l, 50, :s)"), [
+        {"c": rng.randint(1, n_cases), "l": rng.randint(1, n_lawyers), "s": rng.choice(REC_STATUSES)}
+        for _ in range(n_recs)
+    ])
+    conn.execute(text("INSERT INTO active_cases (case_id, lawyer_id, status) VALUES (:c, :l, :s)"), [
+        {"c": rng.randint(1, n_cases), "l": rng.randint(1, n_lawyers), "s": rng.choice(["active", "closed"])}
+        for _ in range(n_recs // 4)
+    ])
+
+
+def measure(engine, repeat: int, n_lawyers: int = 2000) -> dict:
+    params = {"lawyer": n_lawyers // 2, "client": n_lawyers + 7, "case": 11, "user": n_lawyers // 3}
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in HOT_QUERIES.items():
+            plan = " | ".join(row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params))
+            started = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(text(sql), params).fetchall()
+            ms = (time.perf_counter() - started) / repeat * 1000
+            results[name] = (plan, ms)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN + latency before/after the model indexes.")
+    parser.add_argument("--recs", type=int, default=100_000, help="lawyer_recommendations rows to seed")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    # tables as an old legal_rag.db has them: no secondary indexes yet
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        print(f"🌱 Seeding {args.recs} recommendations into {path}...")
+        seed(conn, args.recs)
+        conn.execute(text("ANALYZE"))
+
+    before = measure(engine, args.repeat)
+    started = time.perf_counter()
+    migrate_indexes(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"⏱️ migrate_indexes: {time.perf_counter() - started:.2f}s")
+    after = measure(engine, args.repeat)
+
+    for name in HOT_QUERIES:
+        (plan_b, ms_b), (plan_a, ms_a) = before[name], after[name]
+        print(f"\n📊 {name}: {ms_b:.3f} ms -> {ms_a:.3f} ms ({ms_b / max(ms_a, 1e-9):.0f}x)")
+        print(f"   before: {plan_b}")
+        print(f"   after:  {plan_a}")
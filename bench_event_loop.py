@@ -0,0 +1,127 @@
+# bench_event_loop.py - event-loop lag + login latency: sync Session vs AsyncSession inside async endpoints
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI, Form, HTTPException
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, User, UserRole
+
+CHAT_SECONDS = 0.05  # stand-in for a chat turn; sync def, so it runs in the threadpool like /chat
+
+
+def build_app(path: str, concurrency: int) -> FastAPI:
+    # with the default pool (5 + 10 overflow) the sync variant deadlocks above 15 concurrent logins:
+    # a checkout blocks the loop, so no finished request can run its cleanup and return a connection
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False},
+                           pool_size=concurrency, max_overflow=0)
+    SyncSession = sessionmaker(bind=engine, autoflush=False)
+    AsyncSessionLocal = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{path}"), expire_on_commit=False)
+
+    def get_sync_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.post("/login/sync")
+    async def login_sync(email: str = Form(...), db=Depends(get_sync_db)):
+        # the old endpoint: blocking DB call on the event loop thread
+        client = db.query(User).filter(User.email == email, User.role == UserRole.client).first()
+        if not client:
+            raise HTTPException(status_code=400, detail="Client not found")
+        return {"client_id": client.id}
+
+    @app.post("/login/async")
+    async def login_async(email: str = Form(...), db=Depends(get_async_db)):
+        client = (await db.execute(
+            select(User.id).where(User.email == email, User.role == UserRole.client).limit(1))).first()
+        if not client:
+            raise HTTPException(status_code=400, detail="Client not found")
+        return {"client_id": client.id}
+
+    @app.post("/chat")
+    def chat():
+        time.sleep(CHAT_SECONDS)
+        return {"answer": "..."}
+
+    return app, engine
+
+
+async def ticker(lags: list, stop: asyncio.Event, interval: float = 0.005) -> None:
+    """How late the loop wakes a coroutine that asked to sleep `interval` seconds."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - started - interval) * 1000)
+
+
+async def run(app: FastAPI, mode: str, logins: int, chats: int, concurrency: int, n_users: int) -> dict:
+    lags, latencies = [], []
+    stop = asyncio.Event()
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login(i: int) -> None:
+            async with sem:
+                started = time.perf_counter()
+                r = await client.post(f"/login/{mode}", data={"email": f"client{i % n_users}@bench"})
+                r.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        async def chat() -> None:
+            async with sem:
+                (await client.post("/chat")).raise_for_status()
+
+        tick = asyncio.create_task(ticker(lags, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*[login(i) for i in range(logins)], *[chat() for _ in range(chats)])
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await tick
+
+    # inclusive: with few samples the default "exclusive" method extrapolates past the max
+    p99 = lambda xs: statistics.quantiles(xs, n=100, method="inclusive")[98]
+    return {
+        "mode": mode,
+        "seconds": round(elapsed, 2),
+        "login_p50_ms": round(statistics.median(latencies), 1),
+        "login_p99_ms": round(p99(latencies), 1),
+        "loop_lag_p50_ms": round(statistics.median(lags), 2),
+        "loop_lag_p99_ms": round(p99(lags), 2),
+        "loop_lag_max_ms": round(max(lags), 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event-loop lag of sync vs async DB sessions in async def endpoints.")
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--logins", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    app, engine = build_app(path, args.concurrency)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        print(f"🌱 Seeding {args.users} clients into {path}...")
+        conn.execute(insert(User), [{"email": f"client{i}@bench", "name": f"Client {i}", "password_hash": "x",
+                                     "role": UserRole.client} for i in range(args.users)])
+
+    for mode in ("sync", "async"):
+        print(f"📊 {asyncio.run(run(app, mode, args.logins, args.chats, args.concurrency, args.users))}")
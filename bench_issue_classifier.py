@@ -0,0 +1,93 @@
+# bench_issue_classifier.py - accuracy / latency of the issue classifiers against the old keyword rules
+import argparse
+import time
+from typing import Callable, Dict, List, Tuple
+
+from sentence_transformers import SentenceTransformer
+
+from config_paths import EMBED_MODEL_NAME
+from issue_classifier import IssueClassifier, KeywordIssueMatcher
+
+# held out from ISSUE_EXAMPLES; several are known misfires of the substring rules
+LABELLED_CASES: List[Tuple[str, str]] = [
+    ("My parents gifted me a flat and my brother now claims a share in it.", "property"),
+    ("Current owner of the adjoining plot has blocked the common passage to my house.", "property"),
+    ("Bank refused to release the title documents of my house even after loan closure.", "consumer"),
+    ("Tenant has not paid rent since January and has damaged the fittings.", "tenancy"),
+    ("The landlord increased the rent by 40% mid-lease and threatens eviction.", "tenancy"),
+    ("Builder delayed possession of my flat by three years and will not refund.", "consumer"),
+    ("Vendor took advance payment for a wedding hall booking and cancelled.", "contract"),
+    ("Software client has not paid our invoices for completed work.", "contract"),
+    ("Distributor violated the exclusivity clause in our distribution agreement.", "contract"),
+    ("A truck hit my car at a signal and the driver fled; I need compensation.", "tort"),
+    ("Former employee spread false rumours about my business to customers.", "tort"),
+    ("The school's negligence led to my daughter's injury during a trip.", "tort"),
+    ("My husband has filed for custody of our daughter after the separation.", "family"),
+    ("Seeking maintenance for myself and my child from my estranged husband.", "family"),
+    ("In-laws harass me for dowry and my husband beats me.", "family"),
+    ("Mobile phone stopped working in a week and the service centre refuses repair.", "consumer"),
+    ("Insurance company rejected my claim for a hospital stay without reason.", "consumer"),
+    ("Electricity department is sending inflated bills despite complaints.", "consumer"),
+    ("My uncle occupied our ancestral land and refuses to partition it.", "property"),
+    ("Someone is constructing on my plot using a forged general power of attorney.", "property"),
+    ("The lease deed for our factory premises has expired and the owner wants us out.", "tenancy"),
+    ("Paying guest owner kept my deposit and locked my room.", "tenancy"),
+    ("Contractor used substandard material in the building and it developed cracks.", "contract"),
+    ("The release of my car from the police yard after an accident is being delayed.", "tort"),
+]
+
+
+def legacy_detect_issue_type(text: str) -> str:
+    """IntakeAgent._detect_issue_type before the classifier: substring checks in fixed order."""
+    t = text.lower()
+    CONTRACT = ["contract", "agreement", "breach", "payment", "advance", "construction", "tender"]
+    PROPERTY = ["land", "plot", "property", "encroachment", "boundary", "possession", "injunction"]
+    FAMILY = ["divorce", "maintenance", "custody", "domestic violence"]
+    TORT = ["negligence", "accident", "damages", "defamation"]
+    CONSUMER = ["defective", "refund", "consumer", "service deficiency"]
+    TENANCY = ["tenant", "rent", "eviction", "lease"]
+    if any(k in t for k in CONTRACT): return "contract"
+    if any(k in t for k in PROPERTY): return "property"
+    if any(k in t for k in TENANCY): return "tenancy"
+    if any(k in t for k in CONSUMER): return "consumer"
+    if any(k in t for k in TORT): return "tort"
+    if any(k in t for k in FAMILY): return "family"
+    return "general_civil"
+
+
+def evaluate(name: str, predict: Callable[[int], str], repeat: int) -> Dict:
+    preds = [predict(i) for i in range(len(LABELLED_CASES))]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for i in range(len(LABELLED_CASES)):
+            predict(i)
+    us = (time.perf_counter() - started) / (repeat * len(LABELLED_CASES)) * 1e6
+    correct = sum(p == label for p, (_, label) in zip(preds, LABELLED_CASES))
+    misses = [(text[:50], label, p) for p, (text, label) in zip(preds, LABELLED_CASES) if p != label]
+    return {"classifier": name, "accuracy": round(correct / len(LABELLED_CASES), 3),
+            "us_per_case": round(us, 1), "misses": misses}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Issue-type classifier accuracy and latency.")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    texts = [t for t, _ in LABELLED_CASES]
+    model = SentenceTransformer(EMBED_MODEL_NAME)
+    embed = lambda batch: model.encode(batch, convert_to_numpy=True, show_progress_bar=False)
+    # the vectors come for free at intake (computed for retrieval), so they are not timed here
+    vectors = embed(texts)
+    classifier = IssueClassifier(embed)
+    keywords = KeywordIssueMatcher()
+
+    for result in (
+        evaluate("legacy substring rules", lambda i: legacy_detect_issue_type(texts[i]), args.repeat),
+        evaluate("compiled keyword matcher", lambda i: keywords.match(texts[i]), args.repeat),
+        evaluate("embedding centroids", lambda i: classifier.classify(texts[i], vectors[i]), args.repeat),
+    ):
+        misses = result.pop("misses")
+        print(f"📊 {result}")
+        for text, label, pred in misses:
+            print(f"   ✗ {text!r}: expected {label}, got {pred}")
+    print(f"Fallbacks to keywords: {classifier.stats['keyword']}, centroid hits: {classifier.stats['embedding']}")
@@ -0,0 +1,103 @@
+# bench_sqlite_profile.py - mixed read/write throughput of several processes on one SQLite file, old vs production profile
+import argparse
+import multiprocessing as mp
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import insert, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from bench_db_indexes import seed
+from database import Base, LawyerRecommendation, RecommendationStatus, make_engine, migrate_indexes
+from lawyer_agent import LawyerAgent
+
+N_LAWYERS = 2000
+
+
+def worker(url: str, profile: bool, seconds: float, write_ratio: float, worker_id: int, results) -> None:
+    write_engine = make_engine(url, profile=profile)
+    read_engine = make_engine(url, read_only=True, profile=profile) if profile else write_engine
+    Write, Read = sessionmaker(bind=write_engine), sessionmaker(bind=read_engine)
+    agent = LawyerAgent()
+    rng = random.Random(worker_id)
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    read_ms, write_ms = [], []
+
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        lawyer = rng.randint(1, N_LAWYERS)
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                with Write() as db:
+                    db.execute(insert(LawyerRecommendation), [
+                        {"case_id": rng.randint(1, 1000), "lawyer_id": lawyer, "score": 50,
+                         "status": RecommendationStatus.suggested}])
+                    db.execute(update(LawyerRecommendation)
+                               .where(LawyerRecommendation.id == rng.randint(1, 10_000))
+                               .values(status=RecommendationStatus.client_accepted))
+                    db.commit()
+                counts["writes"] += 1
+                write_ms.append((time.perf_counter() - started) * 1000)
+            else:
+                with Read() as db:
+                    agent.pending_request_rows(db, lawyer)
+                    db.execute(text("SELECT count(*) FROM lawyer_recommendations WHERE case_id = :c"),
+                               {"c": rng.randint(1, 1000)}).scalar()
+                counts["reads"] += 1
+                read_ms.append((time.perf_counter() - started) * 1000)
+        except OperationalError:  # "database is locked" once busy waits run out
+            counts["errors"] += 1
+    results.put((counts, read_ms, write_ms))
+
+
+def run(profile: bool, processes: int, seconds: float, write_ratio: float, n_recs: int) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    url = f"sqlite:///{path}"
+    engine = make_engine(url, profile=profile)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        seed(conn, n_recs, n_lawyers=N_LAWYERS)
+    migrate_indexes(engine)
+    engine.dispose()
+
+    results = mp.Queue()
+    procs = [mp.Process(target=worker, args=(url, profile, seconds, write_ratio, i, results)) for i in range(processes)]
+    for p in procs:
+        p.start()
+    totals, read_ms, write_ms = {"reads": 0, "writes": 0, "errors": 0}, [], []
+    for _ in procs:
+        counts, r, w = results.get()
+        for k, v in counts.items():
+            totals[k] += v
+        read_ms += r
+        write_ms += w
+    for p in procs:
+        p.join()
+
+    p99 = lambda xs: round(statistics.quantiles(xs, n=100)[98], 2) if len(xs) > 1 else None
+    return {
+        "profile": "production (WAL)" if profile else "default (rollback journal)",
+        "ops_per_sec": round((totals["reads"] + totals["writes"]) / seconds),
+        "reads_per_sec": round(totals["reads"] / seconds),
+        "writes_per_sec": round(totals["writes"] / seconds),
+        "errors": totals["errors"],
+        "read_p99_ms": p99(read_ms),
+        "write_p99_ms": p99(write_ms),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-process mixed read/write benchmark of the SQLite profiles.")
+    parser.add_argument("--processes", type=int, default=6)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--recs", type=int, default=50_000)
+    args = parser.parse_args()
+
+    for profile in (False, True):
+        print(f"📊 {run(profile, args.processes, args.seconds, args.write_ratio, args.recs)}")
@@ -0,0 +1,109 @@
+# case_context.py - per-case context, description embedding and retrieved chunks, computed once at intake
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database import Case
+
+CASE_CONTEXT_TOPK = 8
+CASE_VECTOR_WEIGHT = 0.4     # share of the case description in the combined chat query vector
+MAX_DESCRIPTION_CHARS = 1500
+MAX_CASES_IN_MEMORY = 5000   # least recently used cases are rebuilt from the DB on demand
+
+_WS = re.compile(r"\s+")
+
+
+class CaseContext:
+    def __init__(self, case_id: int, issue_type: str, description: str,
+                 vector: Optional[np.ndarray] = None, chunk_ids: Optional[List[str]] = None):
+        self.case_id = case_id
+        self.issue_type = issue_type
+        self.description = _WS.sub(" ", description).strip()[:MAX_DESCRIPTION_CHARS]
+        self.vector = vector
+        self.chunk_ids = chunk_ids or []
+
+    @property
+    def context(self) -> str:
+        """Fixed, safe context string passed to RAG for case-related questions."""
+        return (
+            "CLIENT FACTS – DO NOT ALTER.\n"
+            f"Issue Type: {self.issue_type}\n"
+            f"Description: {self.description}\n"
+        )
+
+    def query_vector(self, q_vec: np.ndarray, weight: float = CASE_VECTOR_WEIGHT) -> np.ndarray:
+        """Question vector blended with the stored description vector; no re-embedding of the case."""
+        if self.vector is None:
+            return q_vec
+        return ((1 - weight) * q_vec + weight * self.vector.reshape(1, -1)).astype("float32")
+
+    def to_dict(self) -> Dict:
+        return {
+            "case_id": self.case_id,
+            "issue_type": self.issue_type,
+            "chunk_ids": self.chunk_ids,
+            "has_vector": self.vector is not None,
+        }
+
+
+class CaseContextStore:
+    """
+    CaseContext per case_id, bounded LRU. Entries are built at intake; a case
+    that is not in memory (restart, eviction) is rebuilt once from its DB row.
+    Without a `rag` only the context string is kept (no vector / chunk ids).
+    """
+
+    def __init__(self, rag=None, topk: int = CASE_CONTEXT_TOPK, max_cases: int = MAX_CASES_IN_MEMORY):
+        self.rag = rag
+        self.topk = topk
+        self.max_cases = max_cases
+        self._cases: "OrderedDict[int, CaseContext]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        if self.rag is None:
+            return None
+        return self.rag.embed(text)[0]
+
+    def build(self, case_id: int, issue_type: str, description: str,
+              vector: Optional[np.ndarray] = None) -> CaseContext:
+        """Store the case, embedding the description and retrieving its chunks unless `vector` is given."""
+        ctx = CaseContext(case_id, issue_type, description)
+        if self.rag is not None:
+            if vector is None:
+                vector = self.embed(ctx.description)
+            ctx.vector = np.asarray(vector, dtype="float32")
+            hits = self.rag.store.search(ctx.vector.reshape(1, -1), self.topk)
+            ctx.chunk_ids = [h["chunk_id"] for h in hits if h.get("chunk_id")]
+        self.put(ctx)
+        return ctx
+
+    def put(self, ctx: CaseContext) -> None:
+        with self._lock:
+            self._cases[ctx.case_id] = ctx
+            self._cases.move_to_end(ctx.case_id)
+            while len(self._cases) > self.max_cases:
+                self._cases.popitem(last=False)
+
+    def get(self, case_id: int, db=None) -> Optional[CaseContext]:
+        with self._lock:
+            ctx = self._cases.get(case_id)
+            if ctx is not None:
+                self._cases.move_to_end(case_id)
+                return ctx
+        if db is None:
+            return None
+        case = db.query(Case).filter(Case.id == case_id).first()
+        if case is None:
+            return None
+        return self.build(case.id, case.issue_type, case.description or "")
+
+    def drop(self, case_id: int) -> None:
+        with self._lock:
+            self._cases.pop(case_id, None)
+
+    def __len__(self) -> int:
+        return len(self._cases)
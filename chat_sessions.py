@@ -0,0 +1,217 @@
+# chat_sessions.py - multi-turn chat per client/case with retained KV cache, LRU memory budget, summaries
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from local_slm import SYSTEM_PROMPT, generate_chat, kv_bytes_per_token, count_tokens
+from rag_slm import ANSWER_DEADLINE_S
+
+SESSION_KV_BUDGET_MB = float(os.getenv("LEXCONNECT_SESSION_KV_MB", "512"))  # all sessions' KV caches together
+SESSION_TTL_SECS = 3600          # idle sessions (history included) are dropped after this
+MODEL_CONTEXT_TOKENS = 2048      # TinyLlama
+TURN_CONTEXT_BUDGET = 400        # retrieved-extract tokens per follow-up turn
+ANSWER_TOKENS = 150
+KEEP_RECENT_TURNS = 2            # never folded into the summary
+SUMMARY_TOKEN_BUDGET = 300       # oldest summary notes are dropped beyond this
+
+_FIRST_SENTENCE = re.compile(r"^(.+?[.!?])(\s|$)")
+
+
+class ChatSession:
+    def __init__(self, key: Tuple):
+        self.key = key
+        self.turns: List[Dict] = []     # {"role", "content"} exactly as sent, so the KV prefix stays valid
+        self.notes: List[str] = []      # one "Q: … A: …" line per folded turn, oldest first
+        self.past_key_values = None
+        self.cached_ids: List[int] = []
+        self.kv_bytes = 0
+        self.last_used = time.time()
+        self.lock = threading.Lock()
+        self.stats = {"turns": 0, "prefill_tokens": 0, "reused_tokens": 0, "compactions": 0,
+                      "notes_dropped": 0}
+
+    @property
+    def summary(self) -> Optional[str]:
+        return " ".join(self.notes) if self.notes else None
+
+    def messages(self, user_content: str) -> List[Dict]:
+        system = SYSTEM_PROMPT
+        if self.summary:
+            system += f"\nEarlier in this conversation: {self.summary}"
+        return [{"role": "system", "content": system}, *self.turns, {"role": "user", "content": user_content}]
+
+    def drop_cache(self) -> int:
+        freed = self.kv_bytes
+        self.past_key_values = None
+        self.cached_ids = []
+        self.kv_bytes = 0
+        return freed
+
+    def compact(self, keep_recent: int = KEEP_RECENT_TURNS) -> bool:
+        """Fold all but the last `keep_recent` question/answer pairs into the running summary."""
+        cut = len(self.turns) - 2 * keep_recent
+        if cut <= 0:
+            return False
+        old = self.turns[:cut]
+        for user, assistant in zip(old[::2], old[1::2]):
+            self.notes.append(f"Q: {_question_of(user['content'])} A: {_first_sentence(assistant['content'])}")
+        self.turns = self.turns[cut:]
+        self.trim_summary(SUMMARY_TOKEN_BUDGET)
+        self.stats["compactions"] += 1
+        return True
+
+    def trim_summary(self, max_tokens: int) -> bool:
+        """Drop the oldest notes until the summary fits `max_tokens`; False if nothing was dropped."""
+        dropped = False
+        while self.notes and count_tokens(self.summary) > max_tokens:
+            self.notes.pop(0)
+            self.stats["notes_dropped"] += 1
+            dropped = True
+        return dropped
+
+    def to_dict(self) -> Dict:
+        return {
+            "history_turns": len(self.turns) // 2,
+            "summarised": bool(self.notes),
+            "kv_tokens": len(self.cached_ids),
+            "kv_mb": round(self.kv_bytes / 2**20, 1),
+            **self.stats,
+        }
+
+
+class ChatSessionManager:
+    """
+    Conversations keyed by (client_id, case_id). Each turn's prompt is the
+    running conversation plus the new RAG prompt, and the KV cache of the
+    previous turn is reused so only the new tokens are prefilled.
+
+    The KV caches of all sessions share SESSION_KV_BUDGET_MB: when over budget,
+    the caches of the least recently used idle sessions are released (their
+    history stays; the next turn re-prefills it). When a conversation would no
+    longer fit the model context, older turns are folded into a short summary.
+    """
+
+    def __init__(self, rag, budget_mb: float = SESSION_KV_BUDGET_MB, ttl: float = SESSION_TTL_SECS):
+        self.rag = rag
+        self.budget_bytes = int(budget_mb * 2**20)
+        self.ttl = ttl
+        self._sessions: "OrderedDict[Tuple, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._kv_bytes_per_token: Optional[int] = None
+        self.stats = {"evicted_caches": 0, "expired_sessions": 0}
+
+    def get(self, client_id: int, case_id: Optional[int] = None) -> ChatSession:
+        key = (client_id, case_id)
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = ChatSession(key)
+            self._sessions.move_to_end(key)
+            return session
+
+    def reset(self, client_id: int, case_id: Optional[int] = None) -> bool:
+        with self._lock:
+            return self._sessions.pop((client_id, case_id), None) is not None
+
+    def answer(self, client_id: int, question: str, case=None,
+               deadline_s: Optional[float] = ANSWER_DEADLINE_S) -> Dict:
+        session = self.get(client_id, getattr(case, "case_id", None))
+        with session.lock:
+            prompt, retrieved, stats = self.rag.prepare(question, case, budget=TURN_CONTEXT_BUDGET)
+            self._fit(session, prompt)
+
+            gen = generate_chat(session.messages(prompt), session.past_key_values, session.cached_ids,
+                                max_new_tokens=ANSWER_TOKENS, temperature=0.2, deadline_s=deadline_s or None)
+            session.turns += [{"role": "user", "content": prompt},
+                              {"role": "assistant", "content": gen["raw_text"]}]
+            session.past_key_values = gen["past_key_values"]
+            session.cached_ids = gen["cached_ids"]
+            session.kv_bytes = len(session.cached_ids) * self._bytes_per_token()
+            session.last_used = time.time()
+            session.stats["turns"] += 1
+            session.stats["prefill_tokens"] += gen["prefill_tokens"]
+            session.stats["reused_tokens"] += gen["reused_tokens"]
+
+        self._enforce_budget(keep=session)
+        return {
+            "answer": gen["text"],
+            "retrieved_count": len(retrieved),
+            "truncated": gen["truncated"],
+            "stop_reason": gen["stop_reason"],
+            "generation_seconds": gen["seconds"],
+            "turn": session.stats["turns"],
+            "prefill_tokens": gen["prefill_tokens"],
+            "prefill_tokens_saved": gen["reused_tokens"],
+            **stats,
+        }
+
+    def _fit(self, session: ChatSession, prompt: str) -> None:
+        """
+        Compact the oldest turns until conversation + new prompt + answer fit the
+        model context; if the summary alone is still too long, drop its oldest notes.
+        """
+        limit = MODEL_CONTEXT_TOKENS - ANSWER_TOKENS
+        while self._conversation_tokens(session, prompt) > limit and session.compact():
+            pass
+        if self._conversation_tokens(session, prompt) > limit and session.turns:
+            session.compact(keep_recent=0)
+        over = self._conversation_tokens(session, prompt) - limit
+        if over > 0 and session.notes:
+            session.trim_summary(max(0, count_tokens(session.summary) - over))
+
+    @staticmethod
+    def _conversation_tokens(session: ChatSession, prompt: str) -> int:
+        # template markup adds a handful of tokens per message
+        return sum(count_tokens(m["content"]) + 8 for m in session.messages(prompt))
+
+    def _bytes_per_token(self) -> int:
+        if self._kv_bytes_per_token is None:
+            self._kv_bytes_per_token = kv_bytes_per_token()
+        return self._kv_bytes_per_token
+
+    def _enforce_budget(self, keep: Optional[ChatSession] = None) -> None:
+        with self._lock:
+            total = sum(s.kv_bytes for s in self._sessions.values())
+            for session in list(self._sessions.values()):  # least recently used first
+                if total <= self.budget_bytes:
+                    break
+                if session is keep or not session.kv_bytes or not session.lock.acquire(blocking=False):
+                    continue
+                try:
+                    total -= session.drop_cache()
+                    self.stats["evicted_caches"] += 1
+                finally:
+                    session.lock.release()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl
+        for key in [k for k, s in self._sessions.items() if s.last_used < cutoff and not s.lock.locked()]:
+            del self._sessions[key]
+            self.stats["expired_sessions"] += 1
+
+    def status(self) -> Dict:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "sessions": len(sessions),
+            "kv_mb": round(sum(s.kv_bytes for s in sessions) / 2**20, 1),
+            "budget_mb": round(self.budget_bytes / 2**20, 1),
+            "prefill_tokens": sum(s.stats["prefill_tokens"] for s in sessions),
+            "prefill_tokens_saved": sum(s.stats["reused_tokens"] for s in sessions),
+            **self.stats,
+        }
+
+
+def _question_of(prompt: str) -> str:
+    m = re.search(r"QUESTION:\s*(.+?)\n", prompt)
+    return (m.group(1) if m else prompt[-200:]).strip()
+
+
+def _first_sentence(text: str) -> str:
+    text = " ".join(text.split())
+    m = _FIRST_SENTENCE.match(text)
+    return (m.group(1) if m else text)[:300]
@@ -0,0 +1,77 @@
+# check_query_counts.py - SQL statements per request path on a seeded scratch DB; exits 1 on a regression
+import os
+import sys
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, User, UserRole, LawyerProfile, Case, LawyerRecommendation, ActiveCase, \
+    RecommendationStatus, count_statements
+from lawyer_agent import LawyerAgent
+from router_agent import RouterAgent
+
+# statements allowed per call, independent of how many rows come back
+EXPECTED = {
+    "LawyerAgent.pending_request_rows": 1,
+    "LawyerAgent.active_case_rows": 1,
+    "LawyerAgent.get_pending_requests + r.case": 1,
+    "LawyerAgent.get_active_cases + c.case": 1,
+    "RouterAgent.get_top_lawyers": 1,
+    "RouterAgent.get_recommendations": 1,
+}
+
+
+def seed(db, n: int = 50) -> None:
+    lawyers = []
+    for i in range(n):
+        user = User(email=f"lawyer{i}@check", name=f"Advocate {i}", password_hash="x", role=UserRole.lawyer)
+        db.add(user)
+        db.flush()
+        profile = LawyerProfile(user_id=user.id, specialization="Property Law", city="Gurugram",
+                                experience_years=i % 20, rating=i % 5, is_available=1)
+        db.add(profile)
+        lawyers.append(profile)
+    client = User(email="client@check", name="Client", password_hash="x", role=UserRole.client)
+    db.add(client)
+    db.flush()
+    for i in range(n):
+        case = Case(client_id=client.id, issue_type="property", description=f"case {i}")
+        db.add(case)
+        db.flush()
+        db.add(LawyerRecommendation(case_id=case.id, lawyer_id=lawyers[0].id, score=50,
+                                    status=RecommendationStatus.client_accepted))
+        db.add(LawyerRecommendation(case_id=1, lawyer_id=lawyers[i].id, score=40))
+        db.add(ActiveCase(case_id=case.id, lawyer_id=lawyers[0].id))
+    db.commit()
+
+
+if __name__ == "__main__":
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'check.db')}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    seed(db)
+    lawyer_id = db.query(LawyerProfile.id).order_by(LawyerProfile.id).first()[0]
+    agent, router = LawyerAgent(), RouterAgent()
+
+    paths = {
+        "LawyerAgent.pending_request_rows": lambda: agent.pending_request_rows(db, lawyer_id),
+        "LawyerAgent.active_case_rows": lambda: agent.active_case_rows(db, lawyer_id),
+        "LawyerAgent.get_pending_requests + r.case":
+            lambda: [r.case.description for r in agent.get_pending_requests(db, lawyer_id)],
+        "LawyerAgent.get_active_cases + c.case":
+            lambda: [c.case.description for c in agent.get_active_cases(db, lawyer_id)],
+        "RouterAgent.get_top_lawyers": lambda: router.get_top_lawyers(db, "property"),
+        "RouterAgent.get_recommendations": lambda: router.get_recommendations(db, 1),
+    }
+    failed = False
+    for name, call in paths.items():
+        db.expire_all()  # no identity-map help: count what a fresh request would issue
+        with count_statements(engine) as stmts:
+            rows = call()
+        if isinstance(rows, dict):  # paginated helpers return a page
+            rows = rows["items"]
+        ok = len(stmts) <= EXPECTED[name]
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {name}: {len(stmts)} statements for {len(rows)} rows (max {EXPECTED[name]})")
+    sys.exit(1 if failed else 0)
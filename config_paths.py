@@ -10,6 +10,17 @@ PDF_DIR = DATA_DIR / "pdfs"
 CIVIL_JSONL = DATA_DIR / "civil_chunks.jsonl"      # text + metadata
 FAISS_INDEX_PATH = DATA_DIR / "faiss_civil.index"  # vector index
 META_JSONL = DATA_DIR / "civil_meta.jsonl"         # metadata only
+SHARD_DIR = DATA_DIR / "shards"                    # one sub-dir per year_month shard (unversioned)
+SNAPSHOT_DIR = DATA_DIR / "snapshots"              # versioned shard sets + CURRENT pointer
+INGEST_WAL_DIR = DATA_DIR / "ingest_wal"           # uploaded chunks not yet compacted into a snapshot
+
+# Ingestion caches (safe to delete; rebuilt on the next run)
+CACHE_DIR = DATA_DIR / "cache"
+PAGE_CACHE_DB = CACHE_DIR / "page_text.sqlite"     # pdf sha1 + page -> title, text
+EMBED_CACHE_DB = CACHE_DIR / "embeddings.sqlite"   # sha1(model + chunk text) -> vector
 
 # Small embedding model
 EMBED_MODEL_NAME = "intfloat/e5-small-v2"  # or "BAAI/bge-small-en-v1.5"
+
+# Optional re-rank stage (LEXCONNECT_RERANK=1)
+RERANK_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
@@ -0,0 +1,90 @@
+# context_packer.py - fit retrieved extracts into a token budget for the SLM prompt
+import re
+from typing import Callable, Dict, List, Tuple
+
+CONTEXT_TOKEN_BUDGET = 900  # TinyLlama has 2048 ctx: leaves room for template, question and answer
+MIN_PARTIAL_TOKENS = 40     # a trimmed extract shorter than this isn't worth its header
+MAX_OVERLAP_CHARS = 400     # chunk_text overlaps neighbours by 200 chars
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+_WS = re.compile(r"\s+")
+
+
+def extract_text(doc: Dict) -> str:
+    """Chunk text from a metadata row, whichever field it was stored under."""
+    return (doc.get("text") or doc.get("chunk") or doc.get("content")
+            or (doc.get("full") or {}).get("text") or "")
+
+
+def _strip_overlap(text: str, kept: List[str]) -> str:
+    """Drop the prefix of `text` that repeats the tail of an already packed neighbour chunk."""
+    for prev in kept:
+        for size in range(min(len(prev), len(text), MAX_OVERLAP_CHARS), 20, -1):
+            if prev.endswith(text[:size]):
+                return text[size:].lstrip()
+    return text
+
+
+def _trim_to_sentences(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> str:
+    out = []
+    used = 0
+    for sentence in _SENTENCE_END.split(text):
+        n = count_tokens(sentence + " ")
+        if used + n > max_tokens:
+            break
+        out.append(sentence)
+        used += n
+    return " ".join(out)
+
+
+def pack_context(extracts: List[Dict], count_tokens: Callable[[str], int],
+                 budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[str, Dict]:
+    """
+    Numbered source lines for the prompt, best extract first, within `budget` tokens.
+
+    Whole extracts are used while they fit; the first one that doesn't is cut at a
+    sentence boundary. Extracts contained in (or overlapping) one already packed
+    from the same page are dropped or have the repeated part removed.
+    Metadata-only rows (civil_meta.jsonl carries no chunk text) are cited by
+    file, page and title instead of being dropped.
+    Returns (sources text, stats with the token count actually used).
+    """
+    lines: List[str] = []
+    kept_by_page: Dict[Tuple, List[str]] = {}
+    stats = {"budget": budget, "tokens": 0, "used": 0, "trimmed": 0, "deduped": 0, "dropped": 0, "metadata_only": 0}
+
+    for doc in extracts:
+        text = _WS.sub(" ", extract_text(doc)).strip()
+        metadata_only = not text
+        if metadata_only:
+            text = _WS.sub(" ", doc.get("title") or "").strip() or "(no extract stored)"
+
+        page_key = (doc.get("file", doc.get("filename")), doc.get("page", doc.get("pagenum")))
+        kept = kept_by_page.setdefault(page_key, [])
+        if any(text in k for k in kept):
+            stats["deduped"] += 1
+            continue
+        stripped = _strip_overlap(text, kept)
+        if stripped != text:
+            stats["deduped"] += 1
+            text = stripped
+
+        header = f"[{len(lines) + 1}] {page_key[0] or 'unknown'} (p{page_key[1] or '?'}): "
+        remaining = budget - stats["tokens"]
+        cost = count_tokens(header + text + "\n")
+        if cost > remaining:
+            room = remaining - count_tokens(header)
+            text = _trim_to_sentences(text, room, count_tokens) if room >= MIN_PARTIAL_TOKENS else ""
+            if not text:
+                stats["dropped"] += 1
+                continue
+            stats["trimmed"] += 1
+            cost = count_tokens(header + text + "\n")
+
+        lines.append(header + text)
+        kept.append(text)
+        stats["tokens"] += cost
+        stats["used"] += 1
+        stats["metadata_only"] += metadata_only
+
+    return "\n".join(lines), stats
@@ -1,19 +1,88 @@
 # database.py - COMPLETE WORKING VERSION FOR LEXCONNECT
-from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, DateTime, Index, inspect, event, text
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 from sqlalchemy import create_engine
+from contextlib import contextmanager
 from datetime import datetime
 import enum
 import os
 
 DB_URL = os.getenv("LEGAL_RAG_DB_URL", "sqlite:///./legal_rag.db")
+READ_DB_URL = os.getenv("LEGAL_RAG_READ_DB_URL", DB_URL)  # e.g. a Postgres read replica
 
-engine = create_engine(
-    DB_URL,
-    connect_args={"check_same_thread": False} if DB_URL.startswith("sqlite") else {},
-)
+# SQLite production profile, applied to every new connection
+SQLITE_BUSY_TIMEOUT_MS = 5000            # wait for the writer lock instead of failing with "database is locked"
+SQLITE_MMAP_BYTES = 256 * 2**20          # reads served from the page cache without read() copies
+SQLITE_CACHE_KB = 16 * 1024              # per connection
+SQLITE_WRITE_POOL = (4, 4)               # (pool_size, max_overflow): one writer at a time anyway
+SQLITE_READ_POOL = (16, 16)              # WAL readers never block each other or the writer
+POOL_TIMEOUT_SECS = 30
+
+def apply_sqlite_pragmas(dbapi_conn, read_only: bool = False) -> None:
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")       # persistent in the file; readers no longer block on writers
+    cursor.execute("PRAGMA synchronous=NORMAL")     # fsync at checkpoints, not every commit (safe with WAL)
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+def make_engine(url: str = DB_URL, read_only: bool = False, profile: bool = True):
+    """
+    Engine for `url`. SQLite files get a bounded pool plus the pragmas above
+    on connect (profile=False keeps the old rollback-journal defaults, for
+    benchmarks); other databases get a plain pre-pinged pool.
+    """
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_pre_ping=True, pool_timeout=POOL_TIMEOUT_SECS)
+    if not profile or ":memory:" in url or url.rstrip("/") == "sqlite:":
+        return create_engine(url, connect_args={"check_same_thread": False})
+    pool_size, max_overflow = SQLITE_READ_POOL if read_only else SQLITE_WRITE_POOL
+    sqlite_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=POOL_TIMEOUT_SECS,
+    )
+    event.listen(sqlite_engine, "connect", lambda conn, _record: apply_sqlite_pragmas(conn, read_only))
+    return sqlite_engine
+
+engine = make_engine(DB_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# GET endpoints read through their own pool, so a burst of page loads never
+# waits behind connections held by writes (and cannot write by mistake).
+read_engine = make_engine(READ_DB_URL, read_only=True)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async twin of the same database for `async def` endpoints: the sync driver in the
+# URL is swapped for its asyncio one (aiosqlite / asyncpg), e.g.
+#   LEGAL_RAG_DB_URL=postgresql://user:pw@host/legal_rag -> postgresql+asyncpg://...
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+
+def async_db_url(url: str = DB_URL) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme.split("+")[0], scheme) + sep + rest
+
+_async_engine = None
+_async_sessionmaker = None
+
+def get_async_engine():
+    """Created on first use, so the sync-only scripts never need aiosqlite / asyncpg installed."""
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        _async_engine = create_async_engine(async_db_url())
+        if DB_URL.startswith("sqlite") and ":memory:" not in DB_URL:
+            event.listen(_async_engine.sync_engine, "connect",
+                         lambda conn, _record: apply_sqlite_pragmas(conn))
+        _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
 Base = declarative_base()
 
 class UserRole(str, enum.Enum):
@@ -41,6 +110,10 @@ class LawyerProfile(Base):
     rating = Column(Integer, nullable=True)
     is_available = Column(Integer, nullable=False, default=1)
     user = relationship("User", back_populates="lawyer_profile")
+    __table_args__ = (
+        Index("ix_lawyer_profiles_user_id", "user_id"),
+        Index("ix_lawyer_profiles_is_available", "is_available"),
+    )
 
 class CaseStatus(str, enum.Enum):
     open = "open"
@@ -57,6 +130,9 @@ class Case(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     client = relationship("User", back_populates="cases")
     recommendations = relationship("LawyerRecommendation", back_populates="case")
+    __table_args__ = (
+        Index("ix_cases_client_id_id", "client_id", "id"),
+    )
 
 class RecommendationStatus(str, enum.Enum):
     suggested = "suggested"
@@ -75,6 +151,10 @@ class LawyerRecommendation(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     case = relationship("Case", back_populates="recommendations")
     lawyer = relationship("LawyerProfile")
+    __table_args__ = (
+        Index("ix_lawyer_recommendations_lawyer_status_id", "lawyer_id", "status", "id"),
+        Index("ix_lawyer_recommendations_case_id", "case_id"),
+    )
 
 class ActiveCase(Base):
     __tablename__ = "active_cases"
@@ -85,11 +165,96 @@ class ActiveCase(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     case = relationship("Case")
     lawyer = relationship("LawyerProfile")
+    __table_args__ = (
+        Index("ix_active_cases_lawyer_status_id", "lawyer_id", "status", "id"),
+    )
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+class IntakeJob(Base):
+    """Background post-intake work for one case (classification, lawyer matching, RAG summary)."""
+    __tablename__ = "intake_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    case_id = Column(Integer, ForeignKey("cases.id"), nullable=False, index=True)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.queued)
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)  # JSON: issue_type, rec_ids, summary
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    heartbeat_at = Column(DateTime, nullable=True)  # lease: set on claim, refreshed between steps
+    case = relationship("Case")
+    __table_args__ = (
+        Index("ix_intake_jobs_status_run_after", "status", "run_after"),
+    )
+
+# replaced by the (..., id) versions above, which also serve the keyset ORDER BY id
+SUPERSEDED_INDEXES = {
+    "cases": ["ix_cases_client_id"],
+    "lawyer_recommendations": ["ix_lawyer_recommendations_lawyer_status"],
+    "active_cases": ["ix_active_cases_lawyer_status"],
+}
+
+def migrate_indexes(bind=None) -> list:
+    """
+    create_all() only creates indexes together with new tables; add any index
+    declared on the models that an existing database file is still missing,
+    and drop the ones they supersede.
+    """
+    bind = bind or engine
+    inspector = inspect(bind)
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=bind)
+                created.append(index.name)
+        stale = [name for name in SUPERSEDED_INDEXES.get(table.name, []) if name in existing]
+        if stale:
+            with bind.begin() as conn:
+                for name in stale:
+                    conn.execute(text(f"DROP INDEX {name}"))
+    if created:
+        print(f"✅ Added indexes: {', '.join(created)}")
+    return created
+
+def migrate_columns(bind=None) -> list:
+    """
+    create_all() never alters existing tables; add nullable columns declared on
+    the models that an existing database file is still missing.
+    """
+    bind = bind or engine
+    inspector = inspect(bind)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        missing = [c for c in table.columns if c.name not in existing and c.nullable]
+        if missing:
+            with bind.begin() as conn:
+                for column in missing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    added.append(f"{table.name}.{column.name}")
+    if added:
+        print(f"✅ Added columns: {', '.join(added)}")
+    return added
 
 # 🔥 SEED DEMO DATA
 def init_db() -> None:
-    """Create tables + seed demo data"""
+    """Create tables + missing columns and indexes + seed demo data"""
     Base.metadata.create_all(bind=engine)
+    migrate_columns()
+    migrate_indexes()
     
     db = SessionLocal()
     try:
@@ -137,6 +302,21 @@ def init_db() -> None:
         db.close()
     print("✅ Database ready with demo data!")
 
+@contextmanager
+def count_statements(bind=None):
+    """Collect the SQL statements executed inside the block: `with count_statements() as stmts: ...`."""
+    bind = bind or engine
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(bind, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", _record)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -144,12 +324,26 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    """AsyncSession dependency for `async def` endpoints: DB round trips never block the event loop."""
+    get_async_engine()
+    async with _async_sessionmaker() as db:
+        yield db
+
 # 🔥 EXPORTS FOR app.py
 __all__ = [
-    'init_db', 'get_db', 
+    'init_db', 'get_db', 'get_read_db', 'get_async_db', 'make_engine', 'get_async_engine', 'migrate_indexes', 'migrate_columns', 'count_statements',
     'User', 'UserRole', 
     'Case', 'CaseStatus',
     'LawyerProfile', 
     'LawyerRecommendation', 'RecommendationStatus',
-    'ActiveCase'
+    'ActiveCase',
+    'IntakeJob', 'JobStatus'
 ]
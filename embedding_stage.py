@@ -0,0 +1,130 @@
+# embedding_stage.py - length-bucketed, adaptively batched embedding for ingestion
+import os
+import time
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+EMBED_WINDOW = 1024            # chunks gathered before bucketing + encoding
+LENGTH_BUCKETS = (300, 600, 900, 1200)  # upper char bound per bucket; chunk_text caps at 1200
+BYTES_PER_FULL_SEQ = 16 * 2**20  # rough activation peak of one full-length chunk in e5-small
+MIN_BATCH, MAX_BATCH = 16, 256
+
+
+def available_memory_bytes() -> int:
+    """Free physical memory; psutil if installed, sysconf on Linux, else a conservative 2 GB."""
+    try:
+        import psutil
+        return int(psutil.virtual_memory().available)
+    except ImportError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return 2 * 2**30
+
+
+def auto_batch_size() -> int:
+    """Batch size for full-length chunks from core count and free memory (a quarter of it)."""
+    by_cores = 8 * (os.cpu_count() or 1)
+    by_memory = available_memory_bytes() // 4 // BYTES_PER_FULL_SEQ
+    return int(max(MIN_BATCH, min(MAX_BATCH, by_cores, by_memory)))
+
+
+class EmbeddingStage:
+    """
+    Collects chunk texts, and per window of EMBED_WINDOW chunks sorts them into
+    length buckets so short tail chunks are never padded to full 1200-char
+    chunks. Shorter buckets get proportionally larger batches (same padded
+    size per call). Vectors reach `sink` in the original order.
+    With an EmbeddingCache only chunks it has never seen are encoded.
+    """
+
+    def __init__(self, embed_model, sink: Callable[[np.ndarray], None],
+                 window: int = EMBED_WINDOW, batch_size: Optional[int] = None,
+                 length_buckets: bool = True, cache=None):
+        self.embed_model = embed_model
+        self.sink = sink
+        self.window = window
+        self.batch_size = batch_size or auto_batch_size()
+        self.length_buckets = length_buckets
+        self.cache = cache
+        self.pending: List[str] = []
+        self.chunks = 0
+        self.encode_seconds = 0.0
+
+    def add(self, text: str) -> None:
+        self.pending.append(text)
+        if len(self.pending) >= self.window:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        self.sink(self.encode(self.pending))
+        self.pending = []
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed `texts`; row i of the result belongs to texts[i]."""
+        if self.cache is None:
+            return self._encode_all(texts)
+
+        cached = self.cache.get_many(texts)
+        missing = [i for i, v in enumerate(cached) if v is None]
+        fresh = self._encode_all([texts[i] for i in missing]) if missing else None
+        if fresh is not None:
+            self.cache.put_many([texts[i] for i in missing], fresh)
+
+        dim = fresh.shape[1] if fresh is not None else cached[0].shape[0]
+        vecs = np.empty((len(texts), dim), dtype="float32")
+        for i, v in enumerate(cached):
+            if v is not None:
+                vecs[i] = v
+        if missing:
+            vecs[missing] = fresh
+        return vecs
+
+    def _encode_all(self, texts: Sequence[str]) -> np.ndarray:
+        started = time.perf_counter()
+        if not self.length_buckets:
+            vecs = self._encode(list(texts), self.batch_size)
+        else:
+            vecs = None
+            for ids, batch_size in self._buckets(texts):
+                part = self._encode([texts[i] for i in ids], batch_size)
+                if vecs is None:
+                    vecs = np.empty((len(texts), part.shape[1]), dtype="float32")
+                vecs[ids] = part
+        self.encode_seconds += time.perf_counter() - started
+        self.chunks += len(texts)
+        return vecs
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.encode_seconds if self.encode_seconds else 0.0
+
+    def report(self) -> str:
+        mode = "length-bucketed" if self.length_buckets else "fixed"
+        return (f"Embedded {self.chunks} chunks in {self.encode_seconds:.1f}s "
+                f"({self.chunks_per_sec:.1f} chunks/sec, {mode}, batch {self.batch_size}, window {self.window})")
+
+    def _buckets(self, texts: Sequence[str]):
+        lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+        order = np.argsort(lengths, kind="stable")
+        bounds = np.searchsorted(lengths[order], LENGTH_BUCKETS, side="right")
+        start = 0
+        for upper, end in zip(LENGTH_BUCKETS, bounds):
+            if end > start:
+                scale = LENGTH_BUCKETS[-1] / upper
+                yield order[start:end], int(min(MAX_BATCH * 4, self.batch_size * scale))
+            start = end
+        if start < len(texts):  # longer than the last bound (custom chunk sizes)
+            yield order[start:], self.batch_size
+
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        return self.embed_model.encode(
+            texts,
+            convert_to_numpy=True,
+            batch_size=batch_size,
+            show_progress_bar=False,
+        ).astype("float32", copy=False)
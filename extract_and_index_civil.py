@@ -1,6 +1,7 @@
 import os
 import re
 import json
+import argparse
 from pathlib import Path
 
 import fitz  # PyMuPDF
@@ -14,6 +15,18 @@ from config_paths import (
     FAISS_INDEX_PATH,
     META_JSONL,
     EMBED_MODEL_NAME,
+    SNAPSHOT_DIR,
+)
+from sharded_index import shard_key_for, write_shard, list_shard_dirs
+from index_snapshots import SnapshotWriter, current_version
+from embedding_stage import EmbeddingStage, EMBED_WINDOW
+from ingest_cache import PageTextCache, EmbeddingCache
+from near_dedup import NearDuplicateFilter, DEFAULT_THRESHOLD
+from vector_compression import (
+    COMPRESSION_ALIASES,
+    build_compressed_index,
+    compression_spec,
+    index_bytes_per_vector,
 )
 
 CRIMINAL_PATTERNS = [
@@ -88,104 +101,244 @@ def save_faiss_index(index):
     faiss.write_index(index, str(FAISS_INDEX_PATH))
 
 
-def main():
-    PDF_DIR.mkdir(parents=True, exist_ok=True)
+def extract_title(text: str):
+    m_title = re.search(r"([A-Z].*?v(?:ersus)?\.?.*?)\n", text)
+    if m_title:
+        return m_title.group(1).strip()
+    return None
+
+
+def extract_pages(pdf_path: Path, on_page=None):
+    """
+    (page_count, [(page_number, title, text), ...]) for every non-empty page.
+    on_page(done, total) is called after each page.
+    """
+    pages = []
+    doc = fitz.open(pdf_path)
+    try:
+        for page_num in range(doc.page_count):
+            page = doc.load_page(page_num)
+            text = page.get_text()
+            if text and text.strip():
+                pages.append((page_num + 1, extract_title(text), text))
+            if on_page is not None:
+                on_page(page_num + 1, doc.page_count)
+        return doc.page_count, pages
+    finally:
+        doc.close()
+
+
+def iter_civil_pages(pdf_path: Path, on_page=None, page_cache=None):
+    """
+    Yield (page_number, title, text) for every civil page of one PDF.
+    With a page_cache, a PDF that was extracted before is never opened again.
+    """
+    cached = None
+    if page_cache is not None:
+        sha1 = page_cache.pdf_hash(pdf_path)
+        cached = page_cache.get_pages(sha1)
+
+    if cached is not None:
+        page_count, pages = cached
+        if on_page is not None:
+            on_page(page_count, page_count)
+    else:
+        page_count, pages = extract_pages(pdf_path, on_page=on_page)
+        if page_cache is not None:
+            page_cache.put_pages(sha1, page_count, pages)
+
+    for page, title, text in pages:
+        if is_civil_page(title, pdf_path.name, text):
+            yield page, title, text
+
+
+def index_pdfs(pdf_files, embed_model, index, desc: str = "Processing PDFs", embed_opts=None,
+               page_cache=None, dedup_threshold=DEFAULT_THRESHOLD):
+    """
+    Chunk + embed the civil pages of pdf_files into index.
+    Returns one row per added vector (metadata + chunk text), in index order.
+    Near-duplicate chunks (repeated headnotes, boilerplate, overlap) are not
+    embedded; the kept row lists them under "merged_from".
+    """
+    rows = []
+    stage = EmbeddingStage(embed_model, index.add, **(embed_opts or {}))
+    deduper = NearDuplicateFilter(dedup_threshold) if dedup_threshold else None
+
+    for pdf_path in tqdm(pdf_files, desc=desc):
+        for page, title, text in iter_civil_pages(pdf_path, page_cache=page_cache):
+            for ch in chunk_text(text):
+                chunk_id = f"{pdf_path.name}_p{page}_c{len(stage.pending)}_{len(rows)}"
+                if deduper is not None:
+                    kept = deduper.check_and_add(ch, len(rows))
+                    if kept is not None:
+                        rows[kept].setdefault("merged_from", []).append(
+                            {"chunk_id": chunk_id, "file": pdf_path.name, "page": page}
+                        )
+                        continue
+                rows.append({
+                    "chunk_id": chunk_id,
+                    "file": pdf_path.name,
+                    "page": page,
+                    "title": title,
+                    "text": ch,
+                })
+                stage.add(ch)
+
+    stage.flush()
+    print(stage.report())
+    if deduper is not None:
+        per_chunk = stage.encode_seconds / stage.chunks if stage.chunks else 0.0
+        print(deduper.report(per_chunk, index.d))
+    return rows
+
+
+def build_monolithic(embed_model, pdf_files, embed_opts=None, page_cache=None,
+                     dedup_threshold=DEFAULT_THRESHOLD):
+    """Legacy layout: one faiss_civil.index + civil_meta.jsonl for the whole corpus."""
     CIVIL_JSONL.parent.mkdir(parents=True, exist_ok=True)
     META_JSONL.parent.mkdir(parents=True, exist_ok=True)
 
-    print(f"Loading embedding model: {EMBED_MODEL_NAME}")
-    embed_model = SentenceTransformer(EMBED_MODEL_NAME)
+    index = create_or_load_faiss_index(embed_model.get_sentence_embedding_dimension())
+    rows = index_pdfs(pdf_files, embed_model, index, embed_opts=embed_opts, page_cache=page_cache,
+                      dedup_threshold=dedup_threshold)
 
-    dim = embed_model.get_sentence_embedding_dimension()
-    index = create_or_load_faiss_index(dim)
+    with open(CIVIL_JSONL, "w", encoding="utf8") as civ_jsonl_f, \
+            open(META_JSONL, "w", encoding="utf8") as meta_jsonl_f:
+        for row in rows:
+            civ_jsonl_f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            meta = {k: v for k, v in row.items() if k != "text"}
+            meta_jsonl_f.write(json.dumps(meta, ensure_ascii=False) + "\n")
 
-    chunk_id_counter = 0
-    batch_texts = []
-    batch_meta = []
-    BATCH_SIZE = 16
+    save_faiss_index(index)
+    print(f"Done. Saved FAISS index at {FAISS_INDEX_PATH}")
+    print(f"Civil chunks JSONL at {CIVIL_JSONL}")
+    print(f"Metadata JSONL at {META_JSONL}")
 
-    civ_jsonl_f = open(CIVIL_JSONL, "w", encoding="utf8")
-    meta_jsonl_f = open(META_JSONL, "w", encoding="utf8")
 
-    pdf_files = list(PDF_DIR.glob("*.pdf"))
-    print(f"Found {len(pdf_files)} PDFs in {PDF_DIR}")
+def group_by_shard(pdf_files):
+    groups = {}
+    for pdf_path in pdf_files:
+        groups.setdefault(shard_key_for(pdf_path.name), []).append(pdf_path)
+    return groups
 
-    try:
-        for pdf_path in tqdm(pdf_files, desc="Processing PDFs"):
-            doc = fitz.open(pdf_path)
-            try:
-                for page_num in range(doc.page_count):
-                    page = doc.load_page(page_num)
-                    text = page.get_text()
-                    if not text or not text.strip():
-                        continue
 
-                    title = None
-                    m_title = re.search(r"([A-Z].*?v(?:ersus)?\.?.*?)\n", text)
-                    if m_title:
-                        title = m_title.group(1).strip()
+def build_shards(embed_model, pdf_files, only=None, embed_opts=None, page_cache=None,
+                 dedup_threshold=DEFAULT_THRESHOLD, compress=None):
+    """
+    (Re)build one shard per year/month into a new index snapshot.
+    With `only`, every other shard is carried over unchanged from the live snapshot.
+    With `compress` (a faiss factory string), the index holds compressed codes and
+    the full-precision vectors go to a memory-mapped side file for exact re-ranking.
+    """
+    dim = embed_model.get_sentence_embedding_dimension()
+    groups = group_by_shard(pdf_files)
 
-                    if not is_civil_page(title, pdf_path.name, text):
-                        continue
+    snapshot = SnapshotWriter(SNAPSHOT_DIR, inherit=bool(only))
+    try:
+        for key in sorted(groups):
+            if only and key not in only:
+                continue
+            index = faiss.IndexFlatL2(dim)
+            rows = index_pdfs(groups[key], embed_model, index, desc=f"Shard {key}",
+                              embed_opts=embed_opts, page_cache=page_cache,
+                              dedup_threshold=dedup_threshold)
+            vectors = None
+            if compress:
+                vectors = index.reconstruct_n(0, index.ntotal)
+                index = build_compressed_index(vectors, compress)
+            write_shard(key, index, rows, snapshot.path, vectors=vectors)
+            print(f"Shard {key}: {index.ntotal} vectors from {len(groups[key])} PDFs"
+                  f" ({index_bytes_per_vector(index):.0f} B/vector in RAM)")
+        version = snapshot.publish()
+    except BaseException:
+        snapshot.abort()
+        raise
+
+    missing = set(only or []) - set(groups)
+    if missing:
+        print(f"No PDFs found for shard(s): {', '.join(sorted(missing))}")
+    print(f"Done. Published index snapshot {version} in {SNAPSHOT_DIR}")
+
+
+def remove_shards(keys):
+    snapshot = SnapshotWriter(SNAPSHOT_DIR)
+    for key in keys:
+        print(f"{'Removed' if snapshot.drop(key) else 'No such'} shard {key}")
+    version = snapshot.publish()
+    print(f"Published index snapshot {version} in {SNAPSHOT_DIR}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract civil judgments and build the FAISS index.")
+    parser.add_argument("--shards", nargs="+", metavar="YYYY_MM",
+                        help="only (re)build these shards, e.g. --shards 2024_11 2024_12")
+    parser.add_argument("--remove-shard", nargs="+", metavar="YYYY_MM", default=[],
+                        help="publish a snapshot without these shards and exit")
+    parser.add_argument("--list-shards", action="store_true", help="list the shards of the live snapshot and exit")
+    parser.add_argument("--monolithic", action="store_true",
+                        help="build the legacy single faiss_civil.index instead of shards")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="encode batch size for full-length chunks (default: tuned to cores/memory)")
+    parser.add_argument("--embed-window", type=int, default=EMBED_WINDOW,
+                        help="chunks gathered before length-bucketing and encoding")
+    parser.add_argument("--no-length-buckets", action="store_true",
+                        help="encode each window in document order (old behaviour: --embed-window 16 --batch-size 16)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignore the page-text and embedding caches in data/cache")
+    parser.add_argument("--dedup-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="estimated Jaccard similarity above which a chunk is dropped as a near-duplicate")
+    parser.add_argument("--no-dedup", action="store_true", help="embed every chunk, duplicates included")
+    parser.add_argument("--compress", default=None,
+                        help="compressed shard index: " + ", ".join(COMPRESSION_ALIASES)
+                             + " or a faiss factory string (see vector_compression.py for a recall report)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.list_shards:
+        version = current_version(SNAPSHOT_DIR)
+        print(f"Snapshot: {version or 'none published'}")
+        if version:
+            for path in list_shard_dirs(SNAPSHOT_DIR / version):
+                print(path.name)
+        return
+
+    if args.remove_shard:
+        remove_shards(args.remove_shard)
+        return
 
-                    chunks = chunk_text(text)
-                    if not chunks:
-                        continue
+    PDF_DIR.mkdir(parents=True, exist_ok=True)
 
-                    for ch in chunks:
-                        chunk_id = f"{pdf_path.name}_p{page_num+1}_c{len(batch_texts)}_{chunk_id_counter}"
-                        chunk_id_counter += 1
-
-                        meta_full = {
-                            "chunk_id": chunk_id,
-                            "file": pdf_path.name,
-                            "page": page_num + 1,
-                            "title": title,
-                            "text": ch,
-                        }
-                        civ_jsonl_f.write(json.dumps(meta_full, ensure_ascii=False) + "\n")
-
-                        batch_texts.append(ch)
-                        batch_meta.append({
-                            "chunk_id": chunk_id,
-                            "file": pdf_path.name,
-                            "page": page_num + 1,
-                            "title": title,
-                        })
-
-                        if len(batch_texts) >= BATCH_SIZE:
-                            vecs = embed_model.encode(
-                                batch_texts,
-                                convert_to_numpy=True,
-                                batch_size=BATCH_SIZE,
-                            )
-                            index.add(vecs)
-                            for m in batch_meta:
-                                meta_jsonl_f.write(json.dumps(m, ensure_ascii=False) + "\n")
-                            batch_texts.clear()
-                            batch_meta.clear()
-
-            finally:
-                doc.close()
-
-        if batch_texts:
-            vecs = embed_model.encode(
-                batch_texts,
-                convert_to_numpy=True,
-                batch_size=BATCH_SIZE,
-            )
-            index.add(vecs)
-            for m in batch_meta:
-                meta_jsonl_f.write(json.dumps(m, ensure_ascii=False) + "\n")
+    print(f"Loading embedding model: {EMBED_MODEL_NAME}")
+    embed_model = SentenceTransformer(EMBED_MODEL_NAME)
 
-    finally:
-        civ_jsonl_f.close()
-        meta_jsonl_f.close()
+    pdf_files = list(PDF_DIR.glob("*.pdf"))
+    print(f"Found {len(pdf_files)} PDFs in {PDF_DIR}")
 
-    save_faiss_index(index)
-    print(f"Done. Saved FAISS index at {FAISS_INDEX_PATH}")
-    print(f"Civil chunks JSONL at {CIVIL_JSONL}")
-    print(f"Metadata JSONL at {META_JSONL}")
+    page_cache = None if args.no_cache else PageTextCache()
+    embed_cache = None if args.no_cache else EmbeddingCache(EMBED_MODEL_NAME)
+    embed_opts = {
+        "window": args.embed_window,
+        "batch_size": args.batch_size,
+        "length_buckets": not args.no_length_buckets,
+        "cache": embed_cache,
+    }
+    dedup_threshold = None if args.no_dedup else args.dedup_threshold
+    if args.monolithic and args.compress:
+        print("--compress only applies to sharded builds; building an uncompressed monolithic index")
+    if args.monolithic:
+        build_monolithic(embed_model, pdf_files, embed_opts=embed_opts, page_cache=page_cache,
+                         dedup_threshold=dedup_threshold)
+    else:
+        build_shards(embed_model, pdf_files, only=set(args.shards or []),
+                     embed_opts=embed_opts, page_cache=page_cache, dedup_threshold=dedup_threshold,
+                     compress=compression_spec(args.compress))
+
+    if page_cache is not None:
+        print(f"Page cache: {page_cache.hits} PDFs reused, {page_cache.misses} parsed")
+        print(f"Embedding cache: {embed_cache.hits} chunks reused, {embed_cache.misses} embedded")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,216 @@
+# index_snapshots.py - versioned index snapshots + hot reload into a running CivilRAGSLM
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config_paths import SNAPSHOT_DIR, SHARD_DIR
+from sharded_index import (
+    ShardedIndex,
+    Shard,
+    list_shard_dirs,
+    delete_shard,
+    load_index_store,
+    shard_fingerprint,
+)
+
+CURRENT_FILE = "CURRENT"  # holds the name of the live snapshot
+KEEP_SNAPSHOTS = 3
+
+
+def current_version(snapshot_dir: Path = SNAPSHOT_DIR) -> Optional[str]:
+    try:
+        version = (Path(snapshot_dir) / CURRENT_FILE).read_text(encoding="utf8").strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def list_versions(snapshot_dir: Path = SNAPSHOT_DIR) -> List[str]:
+    snapshot_dir = Path(snapshot_dir)
+    if not snapshot_dir.exists():
+        return []
+    return sorted(p.name for p in snapshot_dir.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+
+def load_snapshot(version: str, snapshot_dir: Path = SNAPSHOT_DIR,
+                  reuse: Optional[ShardedIndex] = None) -> ShardedIndex:
+    """
+    Load every shard of a snapshot. Shards whose files are unchanged since
+    `reuse` was loaded (hard links from the previous snapshot) are shared
+    instead of read again.
+    """
+    path = Path(snapshot_dir) / version
+    if not path.is_dir():
+        raise FileNotFoundError(f"Index snapshot {version} not found in {snapshot_dir}")
+
+    previous = {s.name: s for s in reuse.shards} if reuse is not None else {}
+    shards = []
+    for shard_path in list_shard_dirs(path):
+        old = previous.get(shard_path.name)
+        if old is not None and old.fingerprint == shard_fingerprint(shard_path):
+            shards.append(old)
+        else:
+            shards.append(Shard.load(shard_path))
+    return ShardedIndex(shards, version=version)
+
+
+def load_current_store(snapshot_dir: Path = SNAPSHOT_DIR) -> ShardedIndex:
+    """The published snapshot, falling back to unversioned shards / the monolithic index."""
+    version = current_version(snapshot_dir)
+    if version:
+        return load_snapshot(version, snapshot_dir)
+    return load_index_store()
+
+
+class SnapshotWriter:
+    """
+    Stages the next snapshot next to the live one and publishes it by rewriting
+    CURRENT. Shards carried over from the current snapshot are hard-linked
+    (copied where the filesystem can't link), so adding a month costs one
+    shard build, not a full rebuild.
+    """
+
+    def __init__(self, snapshot_dir: Path = SNAPSHOT_DIR, inherit: bool = True):
+        self.snapshot_dir = Path(snapshot_dir)
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        self.base_version = current_version(self.snapshot_dir)
+        self.version = datetime.now().strftime("v%Y%m%d-%H%M%S-%f")
+        self.path = self.snapshot_dir / f".{self.version}.tmp"
+        self.path.mkdir()
+
+        if inherit:
+            base = self.snapshot_dir / self.base_version if self.base_version else SHARD_DIR
+            for shard_path in list_shard_dirs(base):
+                _link_tree(shard_path, self.path / shard_path.name)
+
+    def drop(self, name: str) -> bool:
+        return delete_shard(name, self.path)
+
+    def publish(self, keep: int = KEEP_SNAPSHOTS) -> str:
+        final = self.snapshot_dir / self.version
+        self.path.rename(final)
+        self.path = final
+        _atomic_write_text(self.snapshot_dir / CURRENT_FILE, self.version)
+        prune_snapshots(keep, self.snapshot_dir)
+        return self.version
+
+    def abort(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def prune_snapshots(keep: int = KEEP_SNAPSHOTS, snapshot_dir: Path = SNAPSHOT_DIR) -> List[str]:
+    """Delete all but the newest `keep` snapshots (never the current one)."""
+    current = current_version(snapshot_dir)
+    versions = list_versions(snapshot_dir)
+    removed = []
+    for version in versions[:-keep] if keep > 0 else versions:
+        if version == current:
+            continue
+        shutil.rmtree(Path(snapshot_dir) / version, ignore_errors=True)
+        removed.append(version)
+    return removed
+
+
+class IndexReloader:
+    """
+    Loads a new snapshot in the background and swaps it into a CivilRAGSLM.
+
+    Only one snapshot is staged at a time, so at most two index versions are in
+    memory: the live one and the one being loaded. Queries that already hold the
+    old store finish on it; it is freed once they are done.
+    """
+
+    def __init__(self, rag, snapshot_dir: Path = SNAPSHOT_DIR):
+        self.rag = rag
+        self.snapshot_dir = Path(snapshot_dir)
+        self.lock = threading.Lock()  # also held by anything else that publishes + swaps
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_reload_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def loading(self) -> bool:
+        return self.lock.locked()
+
+    def reload(self, version: Optional[str] = None) -> Dict:
+        """Blocking reload of `version` (default: whatever CURRENT points to)."""
+        if not self.lock.acquire(blocking=False):
+            return {"status": "in_progress", "version": self.rag.index_version}
+        try:
+            version = version or current_version(self.snapshot_dir)
+            if not version:
+                return {"status": "no_snapshot", "version": self.rag.index_version}
+            if version == self.rag.index_version:
+                return {"status": "unchanged", "version": version}
+
+            started = time.perf_counter()
+            store = load_snapshot(version, self.snapshot_dir, reuse=self.rag.store)
+            self.rag.swap_store(store)
+            self.last_reload_at = time.time()
+            self.last_error = None
+            print(f"🔄 Index snapshot {version} live: {store.ntotal} vectors "
+                  f"({time.perf_counter() - started:.1f}s)")
+            return {"status": "reloaded", "version": version, "vectors": store.ntotal}
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"❌ Index reload failed: {e}")
+            return {"status": "error", "version": self.rag.index_version, "error": str(e)}
+        finally:
+            self.lock.release()
+
+    def reload_async(self, version: Optional[str] = None) -> bool:
+        """Start a background reload; False if one is already running."""
+        if self.loading:
+            return False
+        threading.Thread(target=self.reload, args=(version,), name="index-reload", daemon=True).start()
+        return True
+
+    def start_watcher(self, interval: float = 10.0) -> None:
+        """Poll CURRENT and reload whenever a new snapshot is published."""
+        if self._watcher is not None:
+            return
+
+        def _watch():
+            while not self._stop.wait(interval):
+                version = current_version(self.snapshot_dir)
+                if version and version != self.rag.index_version and not self.loading:
+                    self.reload(version)
+
+        self._watcher = threading.Thread(target=_watch, name="index-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+
+    def status(self) -> Dict:
+        return {
+            "version": self.rag.index_version,
+            "published": current_version(self.snapshot_dir),
+            "vectors": self.rag.store.ntotal,
+            "shards": self.rag.store.shard_names,
+            "loading": self.loading,
+            "watching": self._watcher is not None and not self._stop.is_set(),
+            "last_reload_at": self.last_reload_at,
+            "last_error": self.last_error,
+        }
+
+
+def _link_tree(src: Path, dst: Path) -> None:
+    dst.mkdir(parents=True, exist_ok=True)
+    for f in src.iterdir():
+        if f.is_file():
+            try:
+                os.link(f, dst / f.name)
+            except OSError:
+                shutil.copy2(f, dst / f.name)
+
+
+def _atomic_write_text(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf8")
+    os.replace(tmp, path)
@@ -0,0 +1,142 @@
+# ingest_cache.py - content-addressed caches for extracted page text and chunk embeddings
+import os
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config_paths import PAGE_CACHE_DB, EMBED_CACHE_DB
+
+
+def file_sha1(path: Path, block: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class _SqliteCache:
+    def __init__(self, path: Path, schema: str):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(schema)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class PageTextCache(_SqliteCache):
+    """
+    (PDF sha1, page) -> (title, text) for every non-empty page, before the civil
+    filter runs, so changing filter rules or chunking never re-parses a PDF.
+    A (path, size, mtime) memo avoids even re-hashing unchanged files.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha1 TEXT);
+    CREATE TABLE IF NOT EXISTS docs (sha1 TEXT PRIMARY KEY, page_count INTEGER);
+    CREATE TABLE IF NOT EXISTS pages (
+        sha1 TEXT, page INTEGER, title TEXT, text TEXT, PRIMARY KEY (sha1, page)
+    );
+    """
+
+    def __init__(self, path: Path = PAGE_CACHE_DB):
+        super().__init__(path, self.SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def pdf_hash(self, pdf_path: Path) -> str:
+        st = os.stat(pdf_path)
+        key = str(Path(pdf_path).resolve())
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, sha1 FROM files WHERE path = ?", (key,)
+            ).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+
+        sha1 = file_sha1(pdf_path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha1) VALUES (?, ?, ?, ?)",
+                (key, st.st_size, st.st_mtime_ns, sha1),
+            )
+        return sha1
+
+    def get_pages(self, sha1: str) -> Optional[Tuple[int, List[Tuple[int, Optional[str], str]]]]:
+        """(page_count, [(page, title, text), ...]) if this PDF was fully extracted before."""
+        with self._lock:
+            doc = self._conn.execute("SELECT page_count FROM docs WHERE sha1 = ?", (sha1,)).fetchone()
+            if doc is None:
+                self.misses += 1
+                return None
+            pages = self._conn.execute(
+                "SELECT page, title, text FROM pages WHERE sha1 = ? ORDER BY page", (sha1,)
+            ).fetchall()
+        self.hits += 1
+        return doc[0], pages
+
+    def put_pages(self, sha1: str, page_count: int, pages: Sequence[Tuple[int, Optional[str], str]]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages WHERE sha1 = ?", (sha1,))
+            self._conn.executemany(
+                "INSERT INTO pages (sha1, page, title, text) VALUES (?, ?, ?, ?)",
+                [(sha1, page, title, text) for page, title, text in pages],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO docs (sha1, page_count) VALUES (?, ?)", (sha1, page_count)
+            )
+
+
+class EmbeddingCache(_SqliteCache):
+    """
+    sha1(model name + chunk text) -> float32 vector stored as a raw BLOB
+    (1.5 KB per e5-small vector), so only never-seen chunks get embedded.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vec BLOB);
+    """
+    LOOKUP_CHUNK = 500  # stay under SQLite's bound-parameter limit
+
+    def __init__(self, model_name: str, path: Path = EMBED_CACHE_DB):
+        super().__init__(path, self.SCHEMA)
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode("utf8")).digest()
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        keys = [self.key(t) for t in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), self.LOOKUP_CHUNK):
+                part = keys[start:start + self.LOOKUP_CHUNK]
+                marks = ",".join("?" * len(part))
+                for k, blob in self._conn.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({marks})", part
+                ):
+                    found[bytes(k)] = blob
+        out = [np.frombuffer(found[k], dtype="float32") if k in found else None for k in keys]
+        hit = sum(v is not None for v in out)
+        self.hits += hit
+        self.misses += len(out) - hit
+        return out
+
+    def put_many(self, texts: Sequence[str], vecs: np.ndarray) -> None:
+        vecs = np.asarray(vecs, dtype="float32")
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)",
+                [(self.key(t), v.tobytes()) for t, v in zip(texts, vecs)],
+            )
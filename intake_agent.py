@@ -1,9 +1,14 @@
 # intake_agent.py
-import re
 from typing import Optional, Dict
+
+import numpy as np
 from sqlalchemy.orm import Session
 
 from database import Case, CaseStatus
+from case_context import CaseContext, CaseContextStore
+from issue_classifier import IssueClassifier
+
+PENDING_ISSUE = "pending"  # issue_type of a case whose post-intake job has not run yet
 
 
 class IntakeAgent:
@@ -11,40 +16,29 @@ class IntakeAgent:
     Very lightweight intake agent:
     - Detects high-level issue type from free text.
     - Stores a Case row in the DB.
-    - Can generate a context string for RAG/chat.
+    - Keeps a per-case context (string, description embedding, top chunks) for RAG/chat.
     """
 
-    def __init__(self):
-        self._last_case: Optional[Dict] = None
-
-    def _detect_issue_type(self, text: str) -> str:
-        t = text.lower()
-
-        CONTRACT = ["contract", "agreement", "breach", "payment", "advance", "construction", "tender"]
-        PROPERTY = ["land", "plot", "property", "encroachment", "boundary", "possession", "injunction"]
-        FAMILY = ["divorce", "maintenance", "custody", "domestic violence"]
-        TORT = ["negligence", "accident", "damages", "defamation"]
-        CONSUMER = ["defective", "refund", "consumer", "service deficiency"]
-        TENANCY = ["tenant", "rent", "eviction", "lease"]
-
-        if any(k in t for k in CONTRACT): return "contract"
-        if any(k in t for k in PROPERTY): return "property"
-        if any(k in t for k in TENANCY): return "tenancy"
-        if any(k in t for k in CONSUMER): return "consumer"
-        if any(k in t for k in TORT): return "tort"
-        if any(k in t for k in FAMILY): return "family"
-
-        return "general_civil"
-
+    def __init__(self, rag=None):
+        self.contexts = CaseContextStore(rag)
+        embed = None
+        if rag is not None:
+            embed = lambda texts: rag.embed_model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+        self.classifier = IssueClassifier(embed)
 
+    def _detect_issue_type(self, text: str, vector: Optional[np.ndarray] = None) -> str:
+        """Nearest issue centroid to `vector` (the retrieval embedding); keyword matcher without one."""
+        return self.classifier.classify(text, vector)
 
     def extract_case_details(self, text: str) -> Dict:
-        issue_type = self._detect_issue_type(text)
+        # embedded once: the same vector classifies the case and is stored for retrieval
+        vector = self.contexts.embed(text.strip())
+        issue_type = self._detect_issue_type(text, vector)
         details = {
             "issue_type": issue_type,
             "raw_description": text.strip(),
+            "embedding": vector,
         }
-        self._last_case = details
         return details
 
     def store_case_details(self, db: Session, details: Dict, client_id: Optional[int] = None) -> int:
@@ -61,22 +55,32 @@ class IntakeAgent:
         db.commit()
         db.refresh(case)
 
-        details_with_id = dict(details)
-        details_with_id["case_id"] = case.id
-        self._last_case = details_with_id
+        self.contexts.build(case.id, details["issue_type"], details["raw_description"],
+                            vector=details.get("embedding"))
         return case.id
 
-    def get_case_context(self) -> Optional[str]:
+    def create_pending_case(self, db: Session, text: str, client_id: Optional[int] = None) -> Case:
+        """Write the case row only; classification and context happen in the post-intake job."""
+        case = Case(
+            client_id=client_id,
+            issue_type=PENDING_ISSUE,
+            description=text.strip(),
+            status=CaseStatus.open,
+        )
+        db.add(case)
+        db.commit()
+        db.refresh(case)
+        return case
+
+    def get_case(self, case_id: int, db: Optional[Session] = None) -> Optional[CaseContext]:
+        """Precomputed context of `case_id`; rebuilt from the DB (if given) when not in memory."""
+        return self.contexts.get(case_id, db)
+
+    def get_case_context(self, case_id: int, db: Optional[Session] = None) -> Optional[str]:
         """
-        Return a fixed, safe context string for the last case.
+        Return a fixed, safe context string for the given case.
         This is passed to RAG so that the chatbot can answer case-related
         questions without the user having to restate everything.
         """
-        if not self._last_case:
-            return None
-
-        return (
-            "CLIENT FACTS – DO NOT ALTER.\n"
-            f"Issue Type: {self._last_case.get('issue_type')}\n"
-            f"Description: {self._last_case.get('raw_description')}\n"
-        )
+        ctx = self.get_case(case_id, db)
+        return ctx.context if ctx else None
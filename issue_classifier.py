@@ -0,0 +1,138 @@
+# issue_classifier.py - issue type from the retrieval embedding (centroids) with a keyword fallback
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_ISSUE = "general_civil"
+MIN_SIMILARITY = 0.80   # e5 cosines sit high; below this no centroid is trusted
+MIN_MARGIN = 0.005      # best vs. runner-up; closer than this falls back to keywords
+
+# a few labelled descriptions per issue type; each centroid is the mean of their embeddings
+ISSUE_EXAMPLES: Dict[str, List[str]] = {
+    "contract": [
+        "Contractor took an advance for house construction and abandoned the work halfway.",
+        "The supplier breached our written agreement and did not deliver the goods on time.",
+        "Buyer has not paid the balance amount due under the sale agreement despite reminders.",
+        "Company cancelled the tender contract after we had already mobilised men and machinery.",
+        "Builder is demanding extra money that was never part of the signed agreement.",
+        "Business partner refuses to honour the terms of our partnership deed.",
+    ],
+    "property": [
+        "My neighbour has encroached on my plot and built a wall inside my boundary.",
+        "Relatives are trying to take possession of ancestral agricultural land.",
+        "I need an injunction to stop someone constructing on my land.",
+        "Dispute over partition of the family house between brothers.",
+        "Someone forged a sale deed and got the property mutated in their name.",
+        "The revenue records show the wrong owner for my land in the village.",
+    ],
+    "tenancy": [
+        "My tenant has stopped paying rent for six months and refuses to vacate.",
+        "Landlord is trying to evict me without notice even though I pay rent on time.",
+        "The lease of my shop has expired and the tenant will not leave.",
+        "Landlord is not returning my security deposit after I vacated the flat.",
+        "Tenant has sublet the premises without my permission.",
+        "Owner cut off water and electricity to force me out of the rented house.",
+    ],
+    "consumer": [
+        "The refrigerator I bought is defective and the company refuses to replace it.",
+        "Online seller did not refund my money for an order that never arrived.",
+        "Hospital billing overcharged me and the insurer rejected a valid claim.",
+        "The airline cancelled my flight and is not giving a refund.",
+        "Deficiency in service by the bank, charges deducted without any reason.",
+        "The car dealer sold me a vehicle with a faulty engine and denies warranty.",
+    ],
+    "tort": [
+        "I was injured in a road accident caused by a rash and negligent driver.",
+        "A newspaper published false statements that damaged my reputation.",
+        "Doctor's negligence during surgery caused permanent harm to my father.",
+        "The municipality's open drain caused my child to fall and get hurt.",
+        "Neighbour's construction damaged the walls of my house and I want compensation.",
+        "Someone posted defamatory videos about me on social media.",
+    ],
+    "family": [
+        "I want a divorce from my husband on grounds of cruelty.",
+        "My wife is seeking maintenance and custody of our children.",
+        "Facing domestic violence from my in-laws, need protection.",
+        "Dispute over custody and visitation rights of my son after separation.",
+        "Husband deserted me and is not paying any maintenance.",
+        "We want a mutual consent divorce and settlement of alimony.",
+    ],
+}
+
+# fallback: old keyword lists, whole words only (plurals allowed), in the old priority order
+ISSUE_KEYWORDS: Dict[str, List[str]] = {
+    "contract": ["contract", "agreement", "breach", "payment", "advance", "construction", "tender"],
+    "property": ["land", "plot", "property", "encroachment", "boundary", "possession", "injunction"],
+    "tenancy": ["tenant", "rent", "eviction", "lease"],
+    "consumer": ["defective", "refund", "consumer", "service deficiency"],
+    "tort": ["negligence", "accident", "damages", "defamation"],
+    "family": ["divorce", "maintenance", "custody", "domestic violence"],
+}
+
+
+class KeywordIssueMatcher:
+    """
+    All keyword lists compiled into one regex with a named group per issue
+    type, scanned once. The type with the most hits wins; ties go to the
+    earlier type in ISSUE_KEYWORDS.
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]] = ISSUE_KEYWORDS):
+        self.labels = list(keywords)
+        alternatives = []
+        for label, words in keywords.items():
+            words = sorted(words, key=len, reverse=True)
+            alternatives.append(f"(?P<{label}>" + "|".join(re.escape(w).replace(r"\ ", r"\s+") for w in words) + ")")
+        self._pattern = re.compile(r"\b(?:" + "|".join(alternatives) + r")(?:s|es)?\b", re.IGNORECASE)
+
+    def match(self, text: str) -> str:
+        counts = dict.fromkeys(self.labels, 0)
+        for m in self._pattern.finditer(text):
+            counts[m.lastgroup] += 1
+        best = max(self.labels, key=lambda label: counts[label])  # max keeps the first on ties
+        return best if counts[best] else DEFAULT_ISSUE
+
+
+class IssueClassifier:
+    """
+    Nearest issue-type centroid to the description's embedding: one matrix
+    multiply on the vector already computed for retrieval. Unconfident or
+    missing embeddings fall back to KeywordIssueMatcher.
+    """
+
+    def __init__(self, embed: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 examples: Dict[str, List[str]] = ISSUE_EXAMPLES):
+        self.keywords = KeywordIssueMatcher()
+        self.labels: List[str] = []
+        self.centroids: Optional[np.ndarray] = None
+        if embed is not None:
+            self.labels = list(examples)
+            texts = [t for label in self.labels for t in examples[label]]
+            vecs = _unit(np.asarray(embed(texts), dtype="float32"))
+            rows, start = [], 0
+            for label in self.labels:
+                n = len(examples[label])
+                rows.append(vecs[start:start + n].mean(axis=0))
+                start += n
+            self.centroids = _unit(np.stack(rows))
+        self.stats = {"embedding": 0, "keyword": 0}
+
+    def classify(self, text: str, vector: Optional[np.ndarray] = None) -> str:
+        return self.classify_with_score(text, vector)[0]
+
+    def classify_with_score(self, text: str, vector: Optional[np.ndarray] = None) -> Tuple[str, Optional[float]]:
+        if vector is not None and self.centroids is not None:
+            sims = self.centroids @ _unit(np.asarray(vector, dtype="float32").reshape(-1))
+            order = np.argsort(sims)[::-1]
+            best, runner_up = float(sims[order[0]]), float(sims[order[1]])
+            if best >= MIN_SIMILARITY and best - runner_up >= MIN_MARGIN:
+                self.stats["embedding"] += 1
+                return self.labels[order[0]], best
+        self.stats["keyword"] += 1
+        return self.keywords.match(text), None
+
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
@@ -1,26 +1,77 @@
-from database import LawyerRecommendation, ActiveCase, RecommendationStatus
+from sqlalchemy import select, update
+from sqlalchemy.orm import joinedload
+
+from database import LawyerRecommendation, ActiveCase, RecommendationStatus, Case
+from pagination import keyset, page, page_size, project
+
+REQUEST_FIELDS = {
+    "rec_id": LawyerRecommendation.id,
+    "case_id": LawyerRecommendation.case_id,
+    "issue_type": Case.issue_type,
+    "description": Case.description,
+}
+ACTIVE_CASE_FIELDS = {
+    "active_id": ActiveCase.id,
+    "case_id": ActiveCase.case_id,
+    "issue_type": Case.issue_type,
+    "description": Case.description,
+}
 
 class LawyerAgent:
 
     def get_pending_requests(self, db, lawyer_id):
-        return db.query(LawyerRecommendation).filter(
+        # case joined in the same query: serialising r.case costs no extra round trip per row
+        return db.query(LawyerRecommendation).options(
+            joinedload(LawyerRecommendation.case)
+        ).filter(
             LawyerRecommendation.lawyer_id == lawyer_id,
             LawyerRecommendation.status == RecommendationStatus.client_accepted
         ).all()
 
-    def accept_case(self, db, rec_id):
-        rec = db.query(LawyerRecommendation).filter(
-            LawyerRecommendation.id == rec_id
-        ).first()
+    def pending_request_rows(self, db, lawyer_id, cursor=None, limit=None, fields=None, preview=None):
+        """One page of the /lawyer/requests JSON, newest first, in one query (see pagination.project)."""
+        limit = page_size(limit)
+        stmt = select(*project(REQUEST_FIELDS, fields, "rec_id", preview)).join(
+            Case, Case.id == LawyerRecommendation.case_id
+        ).where(
+            LawyerRecommendation.lawyer_id == lawyer_id,
+            LawyerRecommendation.status == RecommendationStatus.client_accepted
+        )
+        rows = db.execute(keyset(stmt, LawyerRecommendation.id, cursor, limit)).all()
+        return page(rows, limit, "rec_id")
 
-        if not rec:
-            return None
+    def _transition(self, db, rec_id, from_statuses, to_status, returning=()):
+        """
+        One conditional UPDATE ... WHERE id = ? AND status IN (...). Returns the
+        RETURNING row (or True) if this call made the transition, None if the
+        recommendation is missing or not in one of `from_statuses`. Not committed.
+        """
+        stmt = update(LawyerRecommendation).where(
+            LawyerRecommendation.id == rec_id,
+            LawyerRecommendation.status.in_(from_statuses)
+        ).values(status=to_status)
+        if returning:
+            return db.execute(stmt.returning(*returning)).first()
+        return db.execute(stmt).rowcount == 1 or None
+
+    def client_accept(self, db, rec_id):
+        done = self._transition(db, rec_id, [RecommendationStatus.suggested], RecommendationStatus.client_accepted)
+        db.commit()
+        return bool(done)
 
-        rec.status = RecommendationStatus.lawyer_accepted
+    def accept_case(self, db, rec_id):
+        """client_accepted -> lawyer_accepted plus its ActiveCase, in one transaction; None if not allowed."""
+        row = self._transition(
+            db, rec_id, [RecommendationStatus.client_accepted], RecommendationStatus.lawyer_accepted,
+            returning=(LawyerRecommendation.case_id, LawyerRecommendation.lawyer_id)
+        )
+        if row is None:
+            db.rollback()
+            return None
 
         active = ActiveCase(
-            case_id=rec.case_id,
-            lawyer_id=rec.lawyer_id
+            case_id=row.case_id,
+            lawyer_id=row.lawyer_id
         )
 
         db.add(active)
@@ -28,16 +79,37 @@ class LawyerAgent:
         return active
 
     def decline_case(self, db, rec_id):
-        rec = db.query(LawyerRecommendation).filter(
-            LawyerRecommendation.id == rec_id
-        ).first()
+        done = self._transition(
+            db, rec_id,
+            [RecommendationStatus.suggested, RecommendationStatus.client_accepted],
+            RecommendationStatus.declined
+        )
+        db.commit()
+        return bool(done)
 
-        if rec:
-            rec.status = RecommendationStatus.declined
-            db.commit()
+    def transition_error(self, db, rec_id):
+        """(http status, detail) explaining a rejected transition; only queried on the failure path."""
+        status = db.query(LawyerRecommendation.status).filter(LawyerRecommendation.id == rec_id).scalar()
+        if status is None:
+            return 404, "Recommendation not found"
+        return 409, f"Recommendation is already {status.value}"
 
     def get_active_cases(self, db, lawyer_id):
-        return db.query(ActiveCase).filter(
+        return db.query(ActiveCase).options(
+            joinedload(ActiveCase.case)
+        ).filter(
             ActiveCase.lawyer_id == lawyer_id,
             ActiveCase.status == "active"
         ).all()
+
+    def active_case_rows(self, db, lawyer_id, cursor=None, limit=None, fields=None, preview=None):
+        """One page of the /lawyer/active-cases JSON, newest first, in one query."""
+        limit = page_size(limit)
+        stmt = select(*project(ACTIVE_CASE_FIELDS, fields, "active_id", preview)).join(
+            Case, Case.id == ActiveCase.case_id
+        ).where(
+            ActiveCase.lawyer_id == lawyer_id,
+            ActiveCase.status == "active"
+        )
+        rows = db.execute(keyset(stmt, ActiveCase.id, cursor, limit)).all()
+        return page(rows, limit, "active_id")
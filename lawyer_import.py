@@ -0,0 +1,173 @@
+# lawyer_import.py - bulk upsert of lawyers (user + profile) from CSV / JSONL in batched transactions
+import argparse
+import csv
+import json
+import random
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+from sqlalchemy import insert, select, update
+
+from database import init_db, SessionLocal, User, UserRole, LawyerProfile
+from router_agent import invalidate_rosters
+
+BATCH_SIZE = 1000
+PROFILE_FIELDS = ("specialization", "city", "experience_years", "rating", "is_available")
+TRUE_VALUES = ("1", "true", "yes", "y")
+FALSE_VALUES = ("0", "false", "no", "n")
+
+
+def read_lawyers(path: Path) -> Iterator[Dict]:
+    """Rows from a .csv (header row) or .jsonl file: name, email, phone + the profile fields."""
+    path = Path(path)
+    with open(path, "r", encoding="utf8", newline="") as f:
+        if path.suffix.lower() == ".jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _flag(value, default: int = 1, name: str = "") -> int:
+    """CSV/JSONL availability flag as 0/1; blank or missing means `default`."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return default
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return 1
+    if text in FALSE_VALUES:
+        return 0
+    raise ValueError(f"{name or 'row'}: is_available must be one of {', '.join(TRUE_VALUES + FALSE_VALUES)} (got {value!r})")
+
+
+def _clean(row: Dict) -> Dict:
+    name = (row.get("name") or "").strip()
+    email = (row.get("email") or "").strip().lower() or f"{name.lower().replace(' ', '.')}@lawyer.com"
+    return {
+        "name": name,
+        "email": email,
+        "phone": (row.get("phone") or None),
+        "specialization": row.get("specialization") or None,
+        "city": row.get("city") or None,
+        "experience_years": int(row["experience_years"]) if row.get("experience_years") not in (None, "") else None,
+        "rating": int(row["rating"]) if row.get("rating") not in (None, "") else None,
+        "is_available": _flag(row.get("is_available"), name=name),
+    }
+
+
+def upsert_batch(db, rows: List[Dict]) -> Dict[str, int]:
+    """
+    Insert or update one batch in a single transaction, keyed by email
+    (raises ValueError, writing nothing, if an email belongs to a non-lawyer):
+    two SELECTs, a batched INSERT (... RETURNING for users) per table for new
+    rows and one executemany UPDATE per table for existing ones.
+    """
+    by_email = {r["email"]: r for r in rows}  # last row wins within a batch
+    found = db.execute(select(User.email, User.id, User.role).where(User.email.in_(list(by_email)))).all()
+    taken = sorted(email for email, _, role in found if role != UserRole.lawyer)
+    if taken:
+        # never turn a client (or admin) account into a lawyer or overwrite its details
+        raise ValueError(f"Email already used by a non-lawyer account: {', '.join(taken)}")
+    existing = {email: user_id for email, user_id, _ in found}
+
+    new_users = [{"email": e, "name": r["name"], "phone": r["phone"], "password_hash": "dummyhash",
+                  "role": UserRole.lawyer} for e, r in by_email.items() if e not in existing]
+    updated_users = [{"id": existing[e], "name": r["name"], "phone": r["phone"]}
+                     for e, r in by_email.items() if e in existing]
+    if new_users:
+        # executemany form: one cached statement, batched by SQLAlchemy's insertmanyvalues
+        existing.update(dict(db.execute(insert(User).returning(User.email, User.id), new_users).all()))
+    if updated_users:
+        db.execute(update(User), updated_users)
+
+    user_ids = [existing[e] for e in by_email]
+    profiles = dict(db.execute(
+        select(LawyerProfile.user_id, LawyerProfile.id).where(LawyerProfile.user_id.in_(user_ids))).all())
+    new_profiles, updated_profiles = [], []
+    for email, r in by_email.items():
+        fields = {k: r[k] for k in PROFILE_FIELDS}
+        user_id = existing[email]
+        if user_id in profiles:
+            updated_profiles.append({"id": profiles[user_id], **fields})
+        else:
+            new_profiles.append({"user_id": user_id, **fields})
+    if new_profiles:
+        db.execute(insert(LawyerProfile), new_profiles)
+    if updated_profiles:
+        db.execute(update(LawyerProfile), updated_profiles)
+
+    db.commit()
+    invalidate_rosters()  # bulk INSERT/UPDATE fire no mapper events
+    return {"users_created": len(new_users), "users_updated": len(updated_users),
+            "profiles_created": len(new_profiles), "profiles_updated": len(updated_profiles)}
+
+
+def import_lawyers(rows: Iterable[Dict], batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    totals = {"rows": 0, "batches": 0, "users_created": 0, "users_updated": 0,
+              "profiles_created": 0, "profiles_updated": 0}
+    db = SessionLocal()
+    try:
+        batch: List[Dict] = []
+        for row in rows:
+            row = _clean(row)
+            if not row["name"]:
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                _add(totals, upsert_batch(db, batch), len(batch))
+                batch = []
+        if batch:
+            _add(totals, upsert_batch(db, batch), len(batch))
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return totals
+
+
+def _add(totals: Dict[str, int], counts: Dict[str, int], n: int) -> None:
+    for k, v in counts.items():
+        totals[k] += v
+    totals["rows"] += n
+    totals["batches"] += 1
+
+
+def synthetic_lawyers(n: int, seed: int = 0) -> Iterator[Dict]:
+    """n fake lawyers for timing imports."""
+    rng = random.Random(seed)
+    specs = ["property law", "real estate", "family law", "divorce", "contract law", "construction",
+             "commercial contracts", "tenancy", "consumer protection", "motor accident claims", "civil law"]
+    cities = ["Gurugram", "Faridabad", "Panipat", "Hisar", "Rohtak", "Sonipat", "Chandigarh", "Ambala"]
+    for i in range(n):
+        yield {
+            "name": f"Advocate {i:05d}",
+            "email": f"advocate{i:05d}@import.lexconnect",
+            "phone": f"98{i:08d}",
+            "specialization": ", ".join(rng.sample(specs, 2)),
+            "city": rng.choice(cities),
+            "experience_years": rng.randint(1, 35),
+            "rating": rng.randint(1, 5),
+            "is_available": int(rng.random() < 0.8),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk upsert lawyers from CSV/JSONL (keyed by email).")
+    parser.add_argument("path", nargs="?", help="lawyers .csv or .jsonl")
+    parser.add_argument("--synthetic", type=int, help="import N generated lawyers instead (timing)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    if not args.path and not args.synthetic:
+        parser.error("give a file or --synthetic N")
+
+    init_db()
+    rows = synthetic_lawyers(args.synthetic) if args.synthetic else read_lawyers(Path(args.path))
+    started = time.perf_counter()
+    totals = import_lawyers(rows, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - started
+    print(f"🎉 Imported {totals['rows']} lawyers in {elapsed:.2f}s "
+          f"({totals['rows'] / elapsed if elapsed else 0:.0f} rows/sec, {totals['batches']} transactions)")
+    print(f"📊 {totals}")
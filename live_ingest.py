@@ -0,0 +1,320 @@
+# live_ingest.py - upload -> extract -> embed -> searchable in seconds, compacted into snapshots later
+import os
+import json
+import time
+import uuid
+import base64
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from config_paths import INGEST_WAL_DIR, SNAPSHOT_DIR
+from extract_and_index_civil import iter_civil_pages, chunk_text
+from embedding_stage import EmbeddingStage
+from index_snapshots import SnapshotWriter, current_version, load_snapshot
+from sharded_index import Shard, shard_key_for, write_shard, SHARD_INDEX_FILE
+from rag_slm import LIVE_SHARD
+
+ACTIVE_WAL = "wal.jsonl"
+COMPACT_MIN_ROWS = 2000        # compact once this many chunks are live...
+COMPACT_INTERVAL_SECS = 900    # ...or once the oldest live chunk is this old
+
+
+class IngestJob:
+    def __init__(self, pdf_path: Path):
+        self.id = uuid.uuid4().hex
+        self.file = pdf_path.name
+        self.path = pdf_path
+        self.status = "queued"    # queued -> extracting -> embedding -> indexed | failed
+        self.progress = 0.0
+        self.chunks = 0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "file": self.file,
+            "status": self.status,
+            "progress": round(self.progress, 3),
+            "chunks": self.chunks,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class _Segment:
+    """Chunks from one WAL file, kept in memory until compacted."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.rows: List[Dict] = []
+        self.vecs: List[np.ndarray] = []
+
+    def add(self, rows: List[Dict], vecs: np.ndarray) -> None:
+        self.rows.extend(rows)
+        self.vecs.append(vecs)
+
+
+class IngestWorker:
+    """
+    Background ingestion of uploaded judgment PDFs.
+
+    Each PDF goes through the same civil filter + chunking as the batch indexer,
+    is embedded with the server's model, appended to a write-ahead log and then
+    exposed through CivilRAGSLM's live shard. Compaction merges the live chunks
+    into their year/month shards, publishes a new snapshot and truncates the WAL.
+    """
+
+    def __init__(self, rag, reloader, wal_dir: Path = INGEST_WAL_DIR, snapshot_dir: Path = SNAPSHOT_DIR):
+        self.rag = rag
+        self.reloader = reloader
+        self.wal_dir = Path(wal_dir)
+        self.snapshot_dir = Path(snapshot_dir)
+        self.jobs: Dict[str, IngestJob] = {}
+        self._queue: "queue.Queue[IngestJob]" = queue.Queue()
+        self._live_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._sealed: List[_Segment] = []
+        self._active = _Segment(self.wal_dir / ACTIVE_WAL)
+        self._oldest_live: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+        self.wal_dir.mkdir(parents=True, exist_ok=True)
+        self._recover()
+
+    # ---------- public API ----------
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ingest-worker", daemon=True)
+            self._thread.start()
+
+    def submit(self, pdf_path: Path) -> IngestJob:
+        job = IngestJob(Path(pdf_path))
+        self.jobs[job.id] = job
+        self._queue.put(job)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[IngestJob]:
+        return self.jobs.get(job_id)
+
+    @property
+    def live_rows(self) -> int:
+        return len(self._active.rows) + sum(len(s.rows) for s in self._sealed)
+
+    def compact(self) -> Optional[str]:
+        """Merge all live chunks into a new snapshot. Returns its version, or None if nothing to do."""
+        if current_version(self.snapshot_dir) is None:
+            raise RuntimeError("No index snapshot published yet; run extract_and_index_civil.py first")
+
+        with self._compact_lock:
+            with self._live_lock:
+                if not self.live_rows:
+                    return None
+                snapshot = SnapshotWriter(self.snapshot_dir)
+                sealed = self._seal(snapshot.version)
+
+            version = None
+            try:
+                rows = [r for seg in sealed for r in seg.rows]
+                vecs = np.vstack([v for seg in sealed for v in seg.vecs])
+                self._merge_into_snapshot(snapshot, rows, vecs)
+                with self.reloader.lock:
+                    version = snapshot.publish()
+                    store = load_snapshot(version, self.snapshot_dir, reuse=self.rag.store)
+                    with self._live_lock:
+                        self._sealed = [s for s in self._sealed if s not in sealed]
+                        self.rag.set_live_shard(self._build_live_shard(), store=store)
+            except BaseException:
+                if version is None:
+                    snapshot.abort()
+                    # sealed segments stay live and are retried by the next compaction
+                    self._oldest_live = self._oldest_live or time.time()
+                else:
+                    # CURRENT already names the new snapshot and it holds the sealed rows: keep it, and
+                    # retire the segments so the next compaction does not merge them a second time
+                    with self._live_lock:
+                        self._sealed = [s for s in self._sealed if s not in sealed]
+                        # the live shard must not keep them either, or a reload serves those rows twice
+                        self.rag.set_live_shard(self._build_live_shard())
+                    self._drop_segments(sealed)
+                    print(f"⚠️ Snapshot {version} published but not loaded; reload it with /admin/reload-index")
+                raise
+
+            self._drop_segments(sealed)
+            print(f"🗜️ Compacted {len(rows)} live chunks into snapshot {version}")
+            return version
+
+    # ---------- worker ----------
+
+    def _run(self) -> None:
+        while True:
+            try:
+                job = self._queue.get(timeout=5.0)
+            except queue.Empty:
+                job = None
+
+            if job is not None:
+                self._process(job)
+
+            if self._should_compact():
+                try:
+                    self.compact()
+                except Exception as e:
+                    print(f"❌ Compaction failed: {e}")
+
+    def _should_compact(self) -> bool:
+        # compaction merges into the published snapshot; the legacy monolithic index has none
+        if self._oldest_live is None or current_version(self.snapshot_dir) is None:
+            return False
+        return (self.live_rows >= COMPACT_MIN_ROWS
+                or time.time() - self._oldest_live >= COMPACT_INTERVAL_SECS)
+
+    def _process(self, job: IngestJob) -> None:
+        try:
+            job.status = "extracting"
+
+            def on_page(done, total):
+                job.progress = 0.5 * done / max(total, 1)
+
+            rows = []
+            for page, title, text in iter_civil_pages(job.path, on_page=on_page):
+                for i, ch in enumerate(chunk_text(text)):
+                    rows.append({
+                        "chunk_id": f"{job.file}_p{page}_c{i}_{job.id[:8]}",
+                        "file": job.file,
+                        "page": page,
+                        "title": title,
+                        "text": ch,
+                    })
+
+            job.status = "embedding"
+            job.chunks = len(rows)
+            vec_parts = []
+            stage = EmbeddingStage(self.rag.embed_model, vec_parts.append, window=256)
+            for row in rows:
+                stage.add(row["text"])
+                job.progress = 0.5 + 0.5 * stage.chunks / len(rows)
+            stage.flush()
+
+            if rows:
+                self._append(job.id, rows, np.vstack(vec_parts))
+            job.status = "indexed"
+            job.progress = 1.0
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"❌ Ingest of {job.file} failed: {e}")
+        finally:
+            job.finished_at = time.time()
+
+    # ---------- WAL + live shard ----------
+
+    def _append(self, job_id: str, rows: List[Dict], vecs: np.ndarray) -> None:
+        record = {
+            "job_id": job_id,
+            "rows": rows,
+            "dim": int(vecs.shape[1]),
+            "vectors": base64.b64encode(vecs.tobytes()).decode("ascii"),
+        }
+        with self._live_lock:
+            with open(self._active.path, "a", encoding="utf8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                _fsync(f)
+            self._active.add(rows, vecs)
+            if self._oldest_live is None:
+                self._oldest_live = time.time()
+            self.rag.set_live_shard(self._build_live_shard())
+
+    @staticmethod
+    def _drop_segments(segments: List[_Segment]) -> None:
+        for seg in segments:
+            seg.path.unlink(missing_ok=True)
+
+    def _seal(self, version: str) -> List[_Segment]:
+        """Freeze the active WAL as the input of snapshot `version`; new uploads go to a fresh one."""
+        if self._active.rows:
+            sealed_path = self.wal_dir / f"wal-{version}.sealed.jsonl"
+            self._active.path.rename(sealed_path)
+            self._active.path = sealed_path
+            self._sealed.append(self._active)
+            self._active = _Segment(self.wal_dir / ACTIVE_WAL)
+        self._oldest_live = None
+        return list(self._sealed)
+
+    def _build_live_shard(self) -> Optional[Shard]:
+        segments = self._sealed + [self._active]
+        rows = [r for seg in segments for r in seg.rows]
+        if not rows:
+            return None
+        vecs = np.vstack([v for seg in segments for v in seg.vecs])
+        index = faiss.IndexFlatL2(vecs.shape[1])
+        index.add(vecs)
+        return Shard(LIVE_SHARD, index, rows)
+
+    def _merge_into_snapshot(self, snapshot: SnapshotWriter, rows: List[Dict], vecs: np.ndarray) -> None:
+        by_key: Dict[str, List[int]] = {}
+        for i, row in enumerate(rows):
+            by_key.setdefault(shard_key_for(row["file"]), []).append(i)
+
+        for key, ids in by_key.items():
+            existing = snapshot.path / key
+            full = None
+            if (existing / SHARD_INDEX_FILE).exists():
+                base = Shard.load(existing)
+                index, metas = base.index, list(base.metas)
+                if base.vectors is not None:  # compressed shard: extend its full-precision side file too
+                    full = np.vstack([np.asarray(base.vectors), vecs[ids]])
+            else:
+                index, metas = faiss.IndexFlatL2(vecs.shape[1]), []
+            index.add(vecs[ids])
+            metas.extend(rows[i] for i in ids)
+            write_shard(key, index, metas, snapshot.path, vectors=full)
+
+    def _recover(self) -> None:
+        """Replay WAL files left by a previous run; drop sealed ones whose snapshot got published."""
+        published = current_version(self.snapshot_dir)
+        for path in sorted(self.wal_dir.glob("wal-*.sealed.jsonl")):
+            version = path.name[len("wal-"):-len(".sealed.jsonl")]
+            # an older version alone is not proof: that compaction may have been aborted while
+            # another process published later; only a published snapshot directory holds the rows
+            if published and version <= published and (self.snapshot_dir / version).is_dir():
+                path.unlink()
+                continue
+            seg = _Segment(path)
+            _replay(seg)
+            self._sealed.append(seg)
+
+        _replay(self._active)
+        if self.live_rows:
+            self._oldest_live = time.time()
+            self.rag.set_live_shard(self._build_live_shard())
+            print(f"📥 Recovered {self.live_rows} uncompacted chunks from the ingest WAL")
+
+
+def _replay(seg: _Segment) -> None:
+    if not seg.path.exists():
+        return
+    with open(seg.path, "r", encoding="utf8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break  # torn write at the tail: everything after it never got acknowledged
+            vecs = np.frombuffer(base64.b64decode(record["vectors"]), dtype="float32")
+            seg.add(record["rows"], vecs.reshape(-1, record["dim"]).copy())
+
+
+def _fsync(f) -> None:
+    os.fsync(f.fileno())
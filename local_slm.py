@@ -1,5 +1,8 @@
 import os
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import time
+from typing import Callable, Dict, List, Optional
+
+from transformers import AutoModelForCausalLM, AutoTokenizer, StoppingCriteria, StoppingCriteriaList, TextStreamer
 import torch
 
 MODEL_DIR = r"C:\Users\sahit\Downloads\legal_rag\tinyllama"
@@ -8,17 +11,32 @@ os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
 _model = None
 _tokenizer = None
 
+SENTENCE_GRACE_S = 1.5  # before the deadline: stop at the next sentence end instead of the deadline itself
+REPEAT_NGRAM = 6        # stop once the last 6 tokens have already appeared REPEAT_MAX times
+REPEAT_MAX = 3
+FALLBACK_ANSWER = "Under Indian law, consult a lawyer for case-specific advice."
+
+def get_tokenizer():
+    """TinyLlama tokenizer alone - cheap to load, for token counting without the model."""
+    global _tokenizer
+    if _tokenizer is None:
+        _tokenizer = AutoTokenizer.from_pretrained(MODEL_DIR)
+        if _tokenizer.pad_token is None:
+            _tokenizer.pad_token = _tokenizer.eos_token
+    return _tokenizer
+
+def count_tokens(text: str) -> int:
+    return len(get_tokenizer()(text, add_special_tokens=False)["input_ids"])
+
 def _load_model():
-    global _model, _tokenizer
+    global _model
     if _model is not None:
         return _model, _tokenizer
 
     device = "cuda" if torch.cuda.is_available() else "cpu"
     print(f"🔄 Loading TinyLlama on {device}...")
 
-    _tokenizer = AutoTokenizer.from_pretrained(MODEL_DIR)
-    if _tokenizer.pad_token is None:
-        _tokenizer.pad_token = _tokenizer.eos_token
+    get_tokenizer()
 
     _model = AutoModelForCausalLM.from_pretrained(
         MODEL_DIR,
@@ -29,36 +47,187 @@ def _load_model():
     print("✅ Model loaded!")
     return _model, _tokenizer
 
-def calllocalslm(prompt: str, max_new_tokens: int = 300, temperature: float = 0.1) -> str:
+class DeadlineStop(StoppingCriteria):
+    """
+    Stops generation on a wall-clock deadline or on a repetition loop.
+
+    Within SENTENCE_GRACE_S of the deadline the next token that ends a sentence
+    stops generation; at the deadline itself it stops wherever it is.
+    `reason` tells the caller which one fired ("sentence", "deadline", "repetition").
+    """
+
+    def __init__(self, tokenizer, prompt_len: int, deadline: Optional[float]):
+        self.tokenizer = tokenizer
+        self.prompt_len = prompt_len
+        self.deadline = deadline
+        self.reason: Optional[str] = None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        stop = self._check(input_ids[0, self.prompt_len:].tolist())
+        return torch.full((input_ids.shape[0],), stop, dtype=torch.bool, device=input_ids.device)
+
+    def _check(self, new_ids) -> bool:
+        if not new_ids:
+            return False
+        if self._repeating(new_ids):
+            self.reason = "repetition"
+            return True
+        if self.deadline is None:
+            return False
+        now = time.monotonic()
+        if now >= self.deadline:
+            self.reason = "deadline"
+            return True
+        if now >= self.deadline - SENTENCE_GRACE_S:
+            if self.tokenizer.decode(new_ids[-1:]).rstrip().endswith((".", "!", "?")):
+                self.reason = "sentence"
+                return True
+        return False
+
+    @staticmethod
+    def _repeating(ids) -> bool:
+        n = REPEAT_NGRAM
+        if len(ids) < n * REPEAT_MAX:
+            return False
+        tail = ids[-n:]
+        count = sum(1 for i in range(len(ids) - n + 1) if ids[i:i + n] == tail)
+        return count >= REPEAT_MAX
+
+
+class _CallbackStreamer(TextStreamer):
+    """Hands decoded answer text to `on_text` as whole words become available."""
+
+    def __init__(self, tokenizer, on_text: Callable[[str], None]):
+        super().__init__(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        self.on_text = on_text
+
+    def on_finalized_text(self, text: str, stream_end: bool = False):
+        if text:
+            self.on_text(text)
+
+
+def _cut_to_sentence(text: str) -> str:
+    """Drop a dangling half sentence, if at least one full sentence precedes it."""
+    end = max(text.rfind(". "), text.rfind("! "), text.rfind("? "))
+    if text.rstrip().endswith((".", "!", "?")) or end < 0:
+        return text
+    return text[:end + 1]
+
+
+SYSTEM_PROMPT = (
+    "You are an Indian civil law expert. Answer legal questions directly in 4-6 sentences. "
+    "NEVER give writing instructions, APA format advice, or academic guidance. "
+    "Use plain English about Indian law procedures, timelines, jurisdiction."
+)
+
+def chat_input_ids(messages: List[Dict]):
+    """Token ids of `messages` in the TinyLlama chat template, ready for the assistant's reply."""
     model, tokenizer = _load_model()
-    
     # TinyLlama Chat Template - CRITICAL
+    chat_prompt = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+    return tokenizer(chat_prompt, return_tensors="pt")["input_ids"].to(model.device)
+
+def kv_bytes_per_token() -> int:
+    """Size of one token's keys + values across all layers, from the model config."""
+    model, _ = _load_model()
+    cfg = model.config
+    head_dim = cfg.hidden_size // cfg.num_attention_heads
+    kv_heads = getattr(cfg, "num_key_value_heads", None) or cfg.num_attention_heads
+    return 2 * cfg.num_hidden_layers * kv_heads * head_dim * model.dtype.itemsize
+
+def generate(prompt: str, max_new_tokens: int = 300, temperature: float = 0.1,
+             deadline_s: Optional[float] = None,
+             on_text: Optional[Callable[[str], None]] = None) -> Dict:
+    """
+    Like calllocalslm, but bounded by `deadline_s` seconds of wall-clock time as
+    well as `max_new_tokens`. Returns the answer with `truncated` (stopped by the
+    deadline or a repetition loop rather than EOS / the token cap) and `stop_reason`.
+    `on_text` receives the raw answer text incrementally while it is generated.
+    """
+    started = time.monotonic()
     messages = [
-        {"role": "system", "content": 
-         "You are an Indian civil law expert. Answer legal questions directly in 4-6 sentences. "
-         "NEVER give writing instructions, APA format advice, or academic guidance. "
-         "Use plain English about Indian law procedures, timelines, jurisdiction."},
+        {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": prompt}
     ]
-    
-    # Apply chat template
-    chat_prompt = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
-    
-    inputs = tokenizer(chat_prompt, return_tensors="pt").to(model.device)
+    result = _generate_ids(chat_input_ids(messages), max_new_tokens, temperature,
+                           started, deadline_s, on_text)
+    result.pop("past_key_values")
+    result.pop("cached_ids")
+    return result
+
+def generate_chat(messages: List[Dict], past_key_values=None, cached_ids: Optional[List[int]] = None,
+                  max_new_tokens: int = 300, temperature: float = 0.1,
+                  deadline_s: Optional[float] = None,
+                  on_text: Optional[Callable[[str], None]] = None) -> Dict:
+    """
+    One turn of a multi-turn conversation. `past_key_values` / `cached_ids` are the
+    KV cache and the token ids it covers from the previous turn; the cache is cut
+    back to the longest common prefix with this turn's ids, so only the new tokens
+    are prefilled. Returns generate()'s fields plus the updated cache, its ids and
+    `prefill_tokens` / `reused_tokens`.
+    """
+    started = time.monotonic()
+    input_ids = chat_input_ids(messages)
+    ids = input_ids[0].tolist()
+    reused = 0
+    if past_key_values is not None and cached_ids:
+        while reused < min(len(cached_ids), len(ids) - 1) and cached_ids[reused] == ids[reused]:
+            reused += 1
+        if reused == 0:
+            past_key_values = None
+        elif past_key_values.get_seq_length() > reused:
+            past_key_values.crop(reused)
+    else:
+        past_key_values = None
+    result = _generate_ids(input_ids, max_new_tokens, temperature, started, deadline_s, on_text,
+                           past_key_values=past_key_values)
+    result["prefill_tokens"] = len(ids) - reused
+    result["reused_tokens"] = reused
+    return result
+
+def _generate_ids(input_ids, max_new_tokens: int, temperature: float, started: float,
+                  deadline_s: Optional[float], on_text: Optional[Callable[[str], None]],
+                  past_key_values=None) -> Dict:
+    model, tokenizer = _load_model()
+    prompt_len = input_ids.shape[1]
+    stopper = DeadlineStop(tokenizer, prompt_len, started + deadline_s if deadline_s else None)
     
     with torch.no_grad():
         outputs = model.generate(
-            **inputs,
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            past_key_values=past_key_values,
             max_new_tokens=max_new_tokens,
             do_sample=True,
             temperature=temperature,  # Lower temp = less creative
             top_p=0.9,
             repetition_penalty=1.15,
             pad_token_id=tokenizer.eos_token_id,
+            stopping_criteria=StoppingCriteriaList([stopper]),
+            streamer=_CallbackStreamer(tokenizer, on_text) if on_text else None,
+            use_cache=True,
+            return_dict_in_generate=True,
         )
     
     # Decode ONLY new tokens
-    new_tokens = outputs[0][inputs['input_ids'].shape[1]:]
+    sequence = outputs.sequences[0]
+    new_tokens = sequence[prompt_len:]
     response = tokenizer.decode(new_tokens, skip_special_tokens=True).strip()
+    if stopper.reason in ("deadline", "repetition"):
+        response = _cut_to_sentence(response)
     
-    return response if len(response) > 20 else "Under Indian law, consult a lawyer for case-specific advice."
+    cache = outputs.past_key_values
+    return {
+        "text": response if len(response) > 20 else FALLBACK_ANSWER,
+        "raw_text": response,
+        "truncated": stopper.reason is not None,
+        "stop_reason": stopper.reason or "complete",
+        "new_tokens": int(new_tokens.shape[0]),
+        "seconds": round(time.monotonic() - started, 2),
+        "past_key_values": cache,
+        "cached_ids": sequence[:cache.get_seq_length()].tolist() if cache is not None else [],
+    }
+
+def calllocalslm(prompt: str, max_new_tokens: int = 300, temperature: float = 0.1,
+                 deadline_s: Optional[float] = None) -> str:
+    return generate(prompt, max_new_tokens, temperature, deadline_s)["text"]
@@ -0,0 +1,96 @@
+# near_dedup.py - MinHash/LSH near-duplicate filter for chunks, applied before embedding
+import re
+import zlib
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+SHINGLE_WORDS = 5
+NUM_PERM = 64
+BANDS = 8                  # 8 bands x 8 rows: pairs above ~0.77 Jaccard almost always collide
+DEFAULT_THRESHOLD = 0.85   # estimated Jaccard at or above which a chunk is a duplicate
+
+_MERSENNE = np.uint64((1 << 31) - 1)
+_WORD_RE = re.compile(r"\w+")
+
+
+class NearDuplicateFilter:
+    """
+    Streaming near-duplicate detector. Each chunk is reduced to a MinHash
+    signature over word 5-gram shingles; LSH banding finds candidate matches
+    among the chunks kept so far, and a candidate counts as a duplicate when
+    the signatures agree on at least `threshold` of their positions.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = NUM_PERM,
+                 bands: int = BANDS, seed: int = 7):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self._a = rng.integers(1, int(_MERSENNE), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE), size=num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._exact: Dict[bytes, int] = {}
+        self._sigs: Dict[int, np.ndarray] = {}
+        self.kept = 0
+        self.dropped = 0
+        self.dropped_chars = 0
+
+    def check_and_add(self, text: str, row_id: int) -> Optional[int]:
+        """Row id of the kept chunk `text` duplicates, or None (and `text` is kept as `row_id`)."""
+        words = _WORD_RE.findall(text.lower())
+        exact_key = hashlib.sha1(" ".join(words).encode("utf8")).digest()
+        if exact_key in self._exact:
+            return self._drop(self._exact[exact_key], text)
+
+        sig = self._signature(words)
+        band_keys = self._band_keys(sig)
+        candidates = set()
+        for band, key in enumerate(band_keys):
+            candidates.update(self._buckets[band].get(key, ()))
+        best, best_sim = None, 0.0
+        for cand in candidates:
+            sim = float(np.mean(self._sigs[cand] == sig))
+            if sim > best_sim:
+                best, best_sim = cand, sim
+        if best is not None and best_sim >= self.threshold:
+            return self._drop(best, text)
+
+        self._exact[exact_key] = row_id
+        self._sigs[row_id] = sig
+        for band, key in enumerate(band_keys):
+            self._buckets[band].setdefault(key, []).append(row_id)
+        self.kept += 1
+        return None
+
+    def report(self, seconds_per_chunk: float = 0.0, dim: int = 0) -> str:
+        total = self.kept + self.dropped
+        pct = 100.0 * self.dropped / total if total else 0.0
+        saved_mb = self.dropped * dim * 4 / 2**20
+        return (f"Dedup: dropped {self.dropped}/{total} near-duplicate chunks ({pct:.1f}%), "
+                f"~{self.dropped * seconds_per_chunk:.1f}s embedding and "
+                f"~{saved_mb:.1f} MB of vectors saved")
+
+    def _drop(self, kept_id: int, text: str) -> int:
+        self.dropped += 1
+        self.dropped_chars += len(text)
+        return kept_id
+
+    def _signature(self, words: List[str]) -> np.ndarray:
+        if len(words) <= SHINGLE_WORDS:
+            shingles = [" ".join(words)]
+        else:
+            shingles = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+        x = np.fromiter((zlib.crc32(s.encode("utf8")) for s in set(shingles)), dtype=np.uint64)
+        x %= _MERSENNE
+        # (a*x + b) mod p for every permutation at once; a, x < 2^31 so no uint64 overflow
+        hashed = (self._a[:, None] * x[None, :] + self._b[:, None]) % _MERSENNE
+        return hashed.min(axis=1)
+
+    def _band_keys(self, sig: np.ndarray) -> Tuple[bytes, ...]:
+        r = self.rows_per_band
+        return tuple(sig[i * r:(i + 1) * r].tobytes() for i in range(self.bands))
@@ -0,0 +1,61 @@
+# pagination.py - keyset (cursor) pagination, page-size cap and field projection for the list endpoints
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import func
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_PREVIEW_CHARS = 2000
+
+
+def page_size(limit: Optional[int]) -> int:
+    """Requested page size capped at MAX_PAGE_SIZE (None means the default). Raises ValueError below 1."""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    if limit < 1:
+        raise ValueError(f"limit must be at least 1 (got {limit})")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def project(columns: Dict[str, object], fields: Optional[str] = None, key: Optional[str] = None,
+            preview: Optional[int] = None) -> List:
+    """
+    Labelled columns for a list query. `fields` is a comma-separated subset of
+    `columns` (the cursor `key` is always kept); `preview` cuts `description`
+    to that many characters in SQL, so the full text never leaves the database.
+    Raises ValueError for unknown field names or a preview below 1.
+    """
+    if preview is not None and preview < 1:
+        raise ValueError(f"preview must be at least 1 (got {preview})")
+    names = list(columns)
+    if fields:
+        wanted = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = sorted(wanted - set(columns))
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)} (choose from {', '.join(columns)})")
+        names = [n for n in columns if n in wanted or n == key]
+    selected = []
+    for name in names:
+        col = columns[name]
+        if name == "description" and preview is not None:
+            col = func.substr(col, 1, min(preview, MAX_PREVIEW_CHARS))
+        selected.append(col.label(name))
+    return selected
+
+
+def keyset(stmt, key_col, cursor: Optional[int], limit: int):
+    """
+    Newest first, strictly after `cursor` (the key of the last row already
+    seen). Filtering on the key instead of OFFSET lets the index seek straight
+    to the page, so deep pages cost the same as the first. One extra row is
+    fetched to tell whether another page follows.
+    """
+    if cursor is not None:
+        stmt = stmt.where(key_col < cursor)
+    return stmt.order_by(key_col.desc()).limit(limit + 1)
+
+
+def page(rows: Sequence, limit: int, key: str) -> Dict:
+    items = [dict(r._mapping) for r in rows[:limit]]
+    next_cursor = items[-1][key] if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor, "limit": limit}
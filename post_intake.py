@@ -0,0 +1,213 @@
+# post_intake.py - background classification, lawyer matching and RAG summary after /caseintake
+import json
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+from database import SessionLocal, Case, IntakeJob, JobStatus, LawyerRecommendation
+
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECS = 30     # doubled after every failed attempt
+POLL_INTERVAL_SECS = 5.0    # fallback poll; enqueue() wakes the worker immediately
+LEASE_SECS = 600            # a running job without a heartbeat for this long is taken to be orphaned
+SUMMARY_QUESTION = "Summarise the legal position in this case and the client's next steps under Indian civil law."
+
+
+def job_to_dict(job: IntakeJob) -> Dict:
+    return {
+        "job_id": job.id,
+        "case_id": job.case_id,
+        "status": job.status.value,
+        "attempts": job.attempts,
+        "last_error": job.last_error,
+        "result": json.loads(job.result) if job.result else None,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+class PostIntakeWorker:
+    """
+    Single background thread working through the intake_jobs table.
+
+    A job is claimed with a conditional UPDATE (queued -> running), so a second
+    worker process sharing the database never runs it twice. The claim is a
+    lease: heartbeat_at is refreshed between steps, and only jobs whose
+    heartbeat is older than LEASE_SECS (their process died) are re-queued.
+    The result is written only while this attempt still holds the job.
+    Failures are retried with exponential backoff up to MAX_ATTEMPTS. Every
+    step is idempotent, so a retried job does not duplicate recommendations.
+    """
+
+    def __init__(self, intake, router, rag=None, session_factory=SessionLocal):
+        self.intake = intake
+        self.router = router
+        self.rag = rag
+        self.session_factory = session_factory
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._requeue_stale()
+        self._thread = threading.Thread(target=self._loop, name="post-intake", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def enqueue(self, db, case_id: int) -> IntakeJob:
+        job = IntakeJob(case_id=case_id)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._wake.set()
+        return job
+
+    def latest_job(self, db, case_id: int) -> Optional[IntakeJob]:
+        return db.query(IntakeJob).filter(IntakeJob.case_id == case_id).order_by(IntakeJob.id.desc()).first()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._requeue_stale()
+            if not self.run_pending():
+                self._wake.wait(POLL_INTERVAL_SECS)
+                self._wake.clear()
+
+    def run_pending(self) -> int:
+        """Run every job that is due; returns how many were attempted."""
+        ran = 0
+        while not self._stop.is_set():
+            claim = self._claim_next()
+            if claim is None:
+                return ran
+            self._run(*claim)
+            ran += 1
+        return ran
+
+    def _claim_next(self) -> Optional[Tuple[int, int]]:
+        """(job id, attempt number) of the job this worker now holds, or None."""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            due = db.query(IntakeJob.id).filter(
+                IntakeJob.status == JobStatus.queued,
+                IntakeJob.run_after <= now,
+            ).order_by(IntakeJob.id).limit(5).all()
+            for (job_id,) in due:
+                claimed = db.query(IntakeJob).filter(
+                    IntakeJob.id == job_id,
+                    IntakeJob.status == JobStatus.queued,
+                ).update({
+                    IntakeJob.status: JobStatus.running,
+                    IntakeJob.attempts: IntakeJob.attempts + 1,
+                    IntakeJob.updated_at: now,
+                    IntakeJob.heartbeat_at: now,
+                }, synchronize_session=False)
+                db.commit()
+                if claimed:
+                    attempt = db.query(IntakeJob.attempts).filter(IntakeJob.id == job_id).scalar()
+                    return job_id, attempt
+            return None
+        finally:
+            db.close()
+
+    def _held(self, db, job_id: int, attempt: int):
+        """Query matching the job only while this attempt still holds its lease."""
+        return db.query(IntakeJob).filter(
+            IntakeJob.id == job_id,
+            IntakeJob.status == JobStatus.running,
+            IntakeJob.attempts == attempt,
+        )
+
+    def _run(self, job_id: int, attempt: int) -> None:
+        db = self.session_factory()
+        try:
+            case_id = db.query(IntakeJob.case_id).filter(IntakeJob.id == job_id).scalar()
+
+            def heartbeat() -> None:
+                held = self._held(db, job_id, attempt).update(
+                    {IntakeJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+                db.commit()
+                if not held:
+                    raise _LeaseLost(job_id)
+
+            try:
+                result = self._process(db, case_id, heartbeat)
+            except _LeaseLost:
+                db.rollback()
+                print(f"⚠️ Intake job {job_id} lost its lease (attempt {attempt}); leaving it to its new holder")
+                return
+            except Exception as e:
+                db.rollback()
+                print(f"⚠️ Intake job {job_id} failed (attempt {attempt}): {e}")
+                values = {IntakeJob.last_error: "".join(traceback.format_exception_only(type(e), e)).strip()}
+                if attempt >= MAX_ATTEMPTS:
+                    values[IntakeJob.status] = JobStatus.failed
+                else:
+                    values[IntakeJob.status] = JobStatus.queued
+                    delay = RETRY_BACKOFF_SECS * 2 ** (attempt - 1)
+                    values[IntakeJob.run_after] = datetime.utcnow() + timedelta(seconds=delay)
+            else:
+                values = {
+                    IntakeJob.status: JobStatus.done,
+                    IntakeJob.result: json.dumps(result, ensure_ascii=False),
+                    IntakeJob.last_error: None,
+                }
+            values[IntakeJob.updated_at] = datetime.utcnow()
+            if not self._held(db, job_id, attempt).update(values, synchronize_session=False):
+                print(f"⚠️ Intake job {job_id} was re-queued while attempt {attempt} ran; result discarded")
+            db.commit()
+        finally:
+            db.close()
+
+    def _process(self, db, case_id: int, heartbeat=lambda: None) -> Dict:
+        case = db.query(Case).filter(Case.id == case_id).first()
+        if case is None:
+            raise ValueError(f"case {case_id} no longer exists")
+
+        details = self.intake.extract_case_details(case.description)
+        case.issue_type = details["issue_type"]
+        db.commit()
+        case_ctx = self.intake.contexts.build(case.id, details["issue_type"], details["raw_description"],
+                                              vector=details.get("embedding"))
+        heartbeat()
+
+        rec_ids = [r.id for r in db.query(LawyerRecommendation.id).filter(
+            LawyerRecommendation.case_id == case_id).all()]
+        if not rec_ids:
+            lawyers = self.router.get_top_lawyers(db, case.issue_type)
+            rec_ids = self.router.create_recommendations(db, case_id, lawyers)
+
+        heartbeat()
+        summary = None
+        if self.rag is not None:
+            summary = self.rag.answer(SUMMARY_QUESTION, case_ctx)["answer"]
+
+        return {"issue_type": case.issue_type, "rec_ids": rec_ids, "summary": summary}
+
+    def _requeue_stale(self) -> None:
+        """Re-queue running jobs whose lease expired; jobs other workers are still running are left alone."""
+        db = self.session_factory()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=LEASE_SECS)
+            n = db.query(IntakeJob).filter(
+                IntakeJob.status == JobStatus.running,
+                or_(IntakeJob.heartbeat_at < cutoff,
+                    and_(IntakeJob.heartbeat_at.is_(None), IntakeJob.updated_at < cutoff)),
+            ).update({IntakeJob.status: JobStatus.queued}, synchronize_session=False)
+            db.commit()
+            if n:
+                print(f"🔁 Re-queued {n} intake jobs with expired leases")
+        finally:
+            db.close()
+
+
+class _LeaseLost(Exception):
+    """The job was re-queued (and maybe re-claimed) while this attempt was running it."""
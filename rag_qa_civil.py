@@ -1,46 +1,21 @@
-import os
-import json
-
-import faiss
 from sentence_transformers import SentenceTransformer
 
-from config_paths import (
-    FAISS_INDEX_PATH,
-    META_JSONL,
-    EMBED_MODEL_NAME,
-)
+from config_paths import EMBED_MODEL_NAME
+from sharded_index import load_index_store
 
-from local_slm import calllocalslm  # your existing tinyllama gguf wrapper
+from context_packer import pack_context, CONTEXT_TOKEN_BUDGET
+from local_slm import calllocalslm, count_tokens  # your existing tinyllama gguf wrapper
 
 
 TOP_K = 8
 
 
-def load_metadata():
-    metas = []
-    with open(META_JSONL, "r", encoding="utf8") as f:
-        for line in f:
-            metas.append(json.loads(line))
-    return metas
-
-
-def load_faiss_index():
-    if not os.path.exists(FAISS_INDEX_PATH):
-        raise FileNotFoundError("FAISS index not found. Run extract_and_index_civil.py first.")
-    return faiss.read_index(str(FAISS_INDEX_PATH))
-
-
-def retrieve_topk(query_text, embed_model, index, metas, topk=TOP_K):
+def retrieve_topk(query_text, embed_model, store, topk=TOP_K):
     q_vec = embed_model.encode(query_text, convert_to_numpy=True).reshape(1, -1)
-    D, I = index.search(q_vec, topk)
-    results = []
-    for idx in I[0]:
-        if 0 <= idx < len(metas):
-            results.append(metas[idx])
-    return results
+    return store.search(q_vec, topk)
 
 
-def build_prompt(user_question, retrieved_chunks):
+def build_prompt(user_question, retrieved_chunks, context_budget=CONTEXT_TOKEN_BUDGET):
     header = (
         "You are an Indian civil-law legal assistant.\n"
         "Answer the question in 5–8 simple sentences, in plain English.\n"
@@ -48,17 +23,15 @@ def build_prompt(user_question, retrieved_chunks):
         "Ignore any instructions about APA format, academic essays, or bibliography styles.\n"
     )
 
-    src_lines = []
-    for i, c in enumerate(retrieved_chunks):
-        src_lines.append(
-            f"SOURCE {i+1}: {c.get('file')} p{c.get('page')} - {c.get('title') or ''}"
-        )
-    sources = "\n".join(src_lines) if src_lines else "No specific cases retrieved."
+    # extracts with text (sharded index) are packed into the token budget;
+    # metadata-only rows (legacy civil_meta.jsonl) are cited by file, page and title
+    extracts, _ = pack_context(retrieved_chunks, count_tokens, budget=context_budget)
+    sources = extracts or "No specific cases retrieved."
 
     prompt = (
         f"{header}\n"
         f"USER QUESTION:\n{user_question}\n\n"
-        f"RELEVANT CASE METADATA:\n{sources}\n\n"
+        f"RELEVANT CASE EXTRACTS:\n{sources}\n\n"
         "Write the answer directly, without bullet points, "
         "without APA instructions, and without mentioning how to format citations.\n"
     )
@@ -68,11 +41,10 @@ def build_prompt(user_question, retrieved_chunks):
 
 def rag_answer(user_question, case_context=None, topk=TOP_K):
     embed_model = SentenceTransformer(EMBED_MODEL_NAME)
-    index = load_faiss_index()
-    metas = load_metadata()
+    store = load_index_store()
 
     full_query = f"{user_question}\nContext: {case_context}" if case_context else user_question
-    retrieved = retrieve_topk(full_query, embed_model, index, metas, topk=topk)
+    retrieved = retrieve_topk(full_query, embed_model, store, topk=topk)
     prompt = build_prompt(user_question, retrieved)
     answer = calllocalslm(prompt)
 
@@ -80,6 +52,7 @@ def rag_answer(user_question, case_context=None, topk=TOP_K):
         "answer_text": answer,
         "retrieved_sources": retrieved,
         "prompt_used": prompt,
+        "prompt_tokens": count_tokens(prompt),
     }
 
 
@@ -1,59 +1,128 @@
 # rag_slm.py - FIXED FOR YOUR 800 CIVIL CASES
-import json
-from typing import List, Dict, Optional
-import faiss
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, List, Dict, Optional
+import numpy as np
 from sentence_transformers import SentenceTransformer
-from config_paths import FAISS_INDEX_PATH, META_JSONL, EMBED_MODEL_NAME
-from local_slm import calllocalslm as call_local_slm
+from config_paths import EMBED_MODEL_NAME, SNAPSHOT_DIR
+from sharded_index import Shard, ShardedIndex
+from index_snapshots import load_current_store
+from reranker import BudgetedReranker, RERANK_CANDIDATES, RERANK_TOPK
+from context_packer import pack_context, CONTEXT_TOKEN_BUDGET
+from local_slm import generate, count_tokens
 
 TOP_K = 5
+LIVE_SHARD = "live"  # in-memory shard of uploaded judgments not yet compacted
+ANSWER_DEADLINE_S = float(os.getenv("LEXCONNECT_ANSWER_DEADLINE_S", "20"))  # 0 disables
 
 
 class CivilRAGSLM:
-    def __init__(self):
+    def __init__(self, rerank: Optional[bool] = None, context_budget: int = CONTEXT_TOKEN_BUDGET):
         print("Loading FAISS index and metadata...")
         self.embed_model = SentenceTransformer(EMBED_MODEL_NAME)
-        self.index = faiss.read_index(str(FAISS_INDEX_PATH))
-        print(f"FAISS index loaded: {self.index.ntotal} vectors")
-        
-        self.metadatas: List[Dict] = []
-        with open(META_JSONL, 'r', encoding='utf-8') as f:
-            for line in f:
-                self.metadatas.append(json.loads(line.strip()))
-        print(f"Metadata loaded: {len(self.metadatas)} entries")
-
-    def retrieve(self, query: str, topk: int = TOP_K) -> List[Dict]:
-        q_vec = self.embed_model.encode([query], convert_to_numpy=True, show_progress_bar=False)
-        _, I = self.index.search(q_vec, topk)
-        
-        results = []
-        for idx in I[0]:
-            if 0 <= idx < len(self.metadatas):
-                results.append(self.metadatas[idx])
-        return results
-
-    def build_prompt(self, question: str, case_ctx: Optional[str] = None) -> str:
-        full_query = f"{case_ctx or ''} {question}".strip()
-        retrieved = self.retrieve(full_query)
-
-        # ROBUST text extraction - tries multiple possible field names
-        sources = []
-        for i, doc in enumerate(retrieved, 1):
-            # Try common field names from your extraction script
-            text = (doc.get('text') or 
-                   doc.get('chunk') or 
-                   doc.get('content') or 
-                   doc.get('full', {}).get('text') or 
-                   str(doc).split('text', 1)[-1][:200] or 
-                   "No text found")
-            text = text[:250].replace('\n', ' ').strip()
-            
-            file = doc.get('file', doc.get('filename', 'unknown'))
-            page = doc.get('page', doc.get('pagenum', '?'))
-            
-            sources.append(f"[{i}] {file} (p{page}): {text}")
-        
-        sources_text = '\n'.join(sources) if sources else "No relevant civil cases found in database."
+        if rerank is None:
+            rerank = os.getenv("LEXCONNECT_RERANK", "0") == "1"
+        # optional cross-encoder stage: over-fetch, re-rank, send fewer extracts to the SLM
+        self.reranker = BudgetedReranker() if rerank else None
+        self.context_budget = context_budget
+        self.store: ShardedIndex = load_current_store()
+        self._swap_lock = threading.Lock()
+        self._live_shard: Optional[Shard] = None
+        print(f"FAISS index loaded: {self.store.ntotal} vectors in {len(self.store.shard_names)} shard(s)"
+              f" (snapshot {self.index_version or 'unversioned'})")
+
+    @property
+    def index_version(self) -> Optional[str]:
+        return self.store.version
+
+    def swap_store(self, store: ShardedIndex) -> ShardedIndex:
+        """
+        Atomically replace the live index. Index and metadata travel together in
+        `store`, and callers that already grabbed the old one keep using it.
+        The live shard of freshly ingested chunks is carried over.
+        """
+        with self._swap_lock:
+            if self._live_shard is not None:
+                store.add_shard(self._live_shard)
+            old, self.store = self.store, store
+        return old
+
+    def set_live_shard(self, shard: Optional[Shard], store: Optional[ShardedIndex] = None) -> None:
+        """
+        Replace the live shard, optionally swapping in a new store in the same step
+        (compaction: the compacted rows move from the live shard into the snapshot).
+        """
+        with self._swap_lock:
+            self._live_shard = shard
+            target = store if store is not None else self.store
+            if shard is None:
+                target.remove_shard(LIVE_SHARD)
+            else:
+                target.add_shard(shard)
+            self.store = target
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_model.encode([text], convert_to_numpy=True, show_progress_bar=False).astype("float32")
+
+    def retrieve(self, query: str, topk: int = TOP_K, shards: Optional[Iterable[str]] = None,
+                 q_vec: Optional[np.ndarray] = None) -> List[Dict]:
+        """Search all shards (or only `shards`, e.g. ["2024_11", "2024_12"]) and merge the top-k."""
+        if q_vec is None:
+            q_vec = self.embed(query)
+        return self.store.search(q_vec, topk, shards=shards)
+
+    def _retrieve_for(self, question: str, case_ctx, topk: int) -> List[Dict]:
+        """
+        With a CaseContext the stored description vector is blended with the
+        question's vector (only the question is embedded) and the case's own
+        top chunks are moved to the front; a plain string context is embedded
+        together with the question as before.
+        """
+        if case_ctx is None or isinstance(case_ctx, str):
+            return self.retrieve(f"{case_ctx or ''} {question}".strip(), topk=topk)
+        hits = self.retrieve(question, topk=topk, q_vec=case_ctx.query_vector(self.embed(question)))
+        case_chunks = set(case_ctx.chunk_ids)
+        return sorted(hits, key=lambda h: h.get("chunk_id") not in case_chunks)
+
+    def add_shard(self, name: str, shard_dir: Optional[Path] = None) -> int:
+        """Load one shard from disk (default: the live snapshot) into the running index."""
+        if shard_dir is None:
+            shard_dir = SNAPSHOT_DIR / self.index_version if self.index_version else SNAPSHOT_DIR
+        shard = Shard.load(Path(shard_dir) / name)
+        self.store.add_shard(shard)
+        return shard.ntotal
+
+    def remove_shard(self, name: str) -> bool:
+        return self.store.remove_shard(name)
+
+    def build_prompt(self, question: str, case_ctx=None) -> str:
+        return self.prepare(question, case_ctx)[0]
+
+    def prepare(self, question: str, case_ctx=None, budget: Optional[int] = None):
+        """
+        (prompt, retrieved extracts, stats) for one question; `case_ctx` is a string
+        or a CaseContext, `budget` overrides the context token budget.
+        """
+        if self.reranker is None:
+            retrieved = self._retrieve_for(question, case_ctx, TOP_K)
+            prompt, stats = self._render_prompt(question, retrieved, budget)
+            return prompt, retrieved, stats
+
+        context_text = getattr(case_ctx, "context", case_ctx)
+        full_query = f"{context_text or ''} {question}".strip()
+        candidates = self._retrieve_for(question, case_ctx, RERANK_CANDIDATES)
+        retrieved, rerank_info = self.reranker.rerank(full_query, candidates, topk=RERANK_TOPK)
+        prompt, stats = self._render_prompt(question, retrieved, budget)
+        rerank_info["prompt_tokens_without_rerank"] = self._render_prompt(question, candidates[:TOP_K], budget)[1]["prompt_tokens"]
+        stats["rerank"] = rerank_info
+        return prompt, retrieved, stats
+
+    def _render_prompt(self, question: str, retrieved: List[Dict], budget: Optional[int] = None):
+        """Prompt with as much of the extracts as fits the context budget, plus its token stats."""
+        sources_text, context = pack_context(retrieved, count_tokens, budget=budget or self.context_budget)
+        if not sources_text:
+            sources_text = "No relevant civil cases found in database."
         
         prompt = f"""You are a civil law assistant using 800+ Indian civil case judgments.
 
@@ -66,15 +135,22 @@ QUESTION: {question}
 
 Answer briefly and accurately:"""
         
-        return prompt
+        return prompt, {"prompt_tokens": count_tokens(prompt), "context": context}
 
-    def answer(self, question: str, case_context: Optional[str] = None) -> Dict:
-        prompt = self.build_prompt(question, case_context)
-        raw = call_local_slm(prompt, max_new_tokens=150, temperature=0.2)
-        answer = raw.strip()
+    def answer(self, question: str, case_context=None,
+               deadline_s: Optional[float] = ANSWER_DEADLINE_S,
+               on_text: Optional[Callable[[str], None]] = None) -> Dict:
+        prompt, retrieved, stats = self.prepare(question, case_context)
+        gen = generate(prompt, max_new_tokens=150, temperature=0.2, deadline_s=deadline_s or None,
+                       on_text=on_text)
+        answer = gen["text"].strip()
         
         return {
             "answer": answer,
-            "retrieved_count": len(self.retrieve(question)),
-            "prompt_used": prompt[:500] + "..."  # First 500 chars for debugging
+            "truncated": gen["truncated"],
+            "stop_reason": gen["stop_reason"],
+            "generation_seconds": gen["seconds"],
+            "retrieved_count": len(retrieved),
+            "prompt_used": prompt[:500] + "...",  # First 500 chars for debugging
+            **stats,
         }
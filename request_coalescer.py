@@ -0,0 +1,194 @@
+# request_coalescer.py - single-flight sharing of identical concurrent /chat generations
+import re
+import queue
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+_WS = re.compile(r"\s+")
+_SENTENCE_BREAK = re.compile(r"[.!?] ")
+_DONE = object()
+MIN_ANSWER_CHARS = 21  # local_slm.generate replaces anything shorter with FALLBACK_ANSWER
+
+
+def normalize_question(question: str) -> str:
+    return _WS.sub(" ", question).strip().lower().rstrip("?!. ")
+
+
+class _Flight:
+    """One in-flight computation: its future plus the text streamed so far and who is listening."""
+
+    def __init__(self):
+        self.future: Future = Future()
+        self.chunks: List[str] = []
+        self.subscribers: List[queue.Queue] = []
+        self.lock = threading.Lock()
+
+    def publish(self, text: str) -> None:
+        with self.lock:
+            self.chunks.append(text)
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            q.put(text)
+
+    def subscribe(self) -> queue.Queue:
+        q: queue.Queue = queue.Queue()
+        with self.lock:
+            for text in self.chunks:  # late joiners first get what was already generated
+                q.put(text)
+            self.subscribers.append(q)
+            if self.future.done():
+                q.put(_DONE)
+        return q
+
+    def finish(self, result=None, error: Optional[BaseException] = None) -> None:
+        with self.lock:
+            if error is not None:
+                self.future.set_exception(error)
+            else:
+                self.future.set_result(result)
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            q.put(_DONE)
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time. Callers arriving while a
+    computation for their key is running wait for it and get the same result
+    (or exception) instead of starting their own. Nothing is cached: once a
+    flight finishes, the next caller starts a fresh one.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "executed": 0, "coalesced": 0, "errors": 0}
+
+    def _join(self, key: str) -> Tuple[_Flight, bool]:
+        with self._lock:
+            self.stats["requests"] += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.stats["coalesced"] += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            self.stats["executed"] += 1
+            return flight, True
+
+    def _run(self, key: str, flight: _Flight, compute: Callable[[Callable[[str], None]], object]) -> None:
+        try:
+            result = compute(flight.publish)
+        except BaseException as e:
+            with self._lock:
+                self.stats["errors"] += 1
+                self._flights.pop(key, None)
+            flight.finish(error=e)
+            return
+        with self._lock:
+            self._flights.pop(key, None)
+        flight.finish(result)
+
+    def do(self, key: str, compute: Callable[[Callable[[str], None]], object]) -> Tuple[object, bool]:
+        """(result, shared); `compute(on_text)` only runs if no flight for `key` is in progress."""
+        flight, leader = self._join(key)
+        if leader:
+            self._run(key, flight, compute)
+        return flight.future.result(), not leader
+
+    def stream(self, key: str, compute: Callable[[Callable[[str], None]], object]) -> Tuple[Iterator[str], Future]:
+        """
+        Text pieces of the (possibly shared) computation as they are produced, and
+        its future. A new flight runs on a background thread so the caller can
+        consume the stream; the iterator raises the flight's error, if any, at the end.
+        """
+        flight, leader = self._join(key)
+        q = flight.subscribe()
+        if leader:
+            threading.Thread(target=self._run, args=(key, flight, compute), daemon=True).start()
+
+        def _iter():
+            while True:
+                item = q.get()
+                if item is _DONE:
+                    break
+                yield item
+            flight.future.result()  # re-raise a failed generation
+
+        return _iter(), flight.future
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+
+class _SentenceGate:
+    """
+    Passes streamed answer text on only up to its last complete sentence, and
+    then the final answer's remainder. local_slm.generate cuts a truncated answer
+    back to a sentence end (or replaces a too-short one with FALLBACK_ANSWER),
+    so holding back the unfinished sentence keeps the stream equal to /chat.
+    """
+
+    def __init__(self, on_text: Callable[[str], None]):
+        self.on_text = on_text
+        self.text = ""
+        self.sent = 0
+
+    def feed(self, text: str) -> None:
+        self.text += text
+        ends = [m.start() + 1 for m in _SENTENCE_BREAK.finditer(self.text.lstrip(), self.sent)]
+        if ends and ends[-1] >= MIN_ANSWER_CHARS:
+            self._emit(self.text.lstrip()[self.sent:ends[-1]])
+            self.sent = ends[-1]
+
+    def finish(self, answer: str) -> None:
+        sent = self.text.lstrip()[:self.sent]
+        # the streamer and the final decode can differ in whitespace; never leave the stream wrong
+        self._emit(answer[len(sent):] if answer.startswith(sent) else "\n" + answer)
+
+    def _emit(self, text: str) -> None:
+        if text:
+            self.on_text(text)
+
+
+class CoalescingAnswerer:
+    """
+    Front of CivilRAGSLM.answer: concurrent requests with the same normalized
+    question, case context, generation settings and index version share one
+    retrieval + generation.
+    """
+
+    def __init__(self, rag):
+        self.rag = rag
+        self.flights = SingleFlight()
+
+    def key(self, question: str, case_context=None, **params) -> str:
+        """`case_context` is a context string or a CaseContext (keyed by its context string)."""
+        context_text = getattr(case_context, "context", case_context) or ""
+        ctx_hash = hashlib.sha1(context_text.encode("utf8")).hexdigest()
+        settings = ",".join(f"{k}={params[k]}" for k in sorted(params))
+        raw = "\0".join([normalize_question(question), ctx_hash, settings, self.rag.index_version or ""])
+        return hashlib.sha1(raw.encode("utf8")).hexdigest()
+
+    def answer(self, question: str, case_context=None, **params) -> Dict:
+        key = self.key(question, case_context, **params)
+        result, shared = self.flights.do(key, lambda on_text: self._generate(question, case_context, on_text, params))
+        return {**result, "coalesced": shared}
+
+    def stream(self, question: str, case_context=None, **params) -> Iterator[str]:
+        key = self.key(question, case_context, **params)
+        pieces, _ = self.flights.stream(key, lambda on_text: self._generate(question, case_context, on_text, params))
+        return pieces
+
+    def _generate(self, question: str, case_context, on_text: Callable[[str], None], params: Dict) -> Dict:
+        gate = _SentenceGate(on_text)
+        result = self.rag.answer(question, case_context, on_text=gate.feed, **params)
+        gate.finish(result["answer"])
+        return result
+
+    def status(self) -> Dict:
+        return {**self.flights.stats, "generations_saved": self.flights.stats["coalesced"],
+                "in_flight": self.flights.in_flight}
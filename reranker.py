@@ -0,0 +1,81 @@
+# reranker.py - optional cross-encoder re-rank of FAISS candidates under a per-request time budget
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sentence_transformers import CrossEncoder
+
+from config_paths import RERANK_MODEL_NAME
+
+RERANK_CANDIDATES = 20   # FAISS over-fetch fed to the cross-encoder
+RERANK_TOPK = 3          # extracts kept for the prompt after re-ranking
+RERANK_BUDGET_MS = 150.0
+MAX_TEXT_CHARS = 1200
+SKIP_DECAY = 0.9         # each skip lowers the cost estimate, so one slow measurement can't disable re-ranking for good
+
+
+class BudgetedReranker:
+    """
+    Scores (query, extract) pairs with a small local cross-encoder in one batch.
+
+    The cost per pair is tracked as a moving average; a request only scores as
+    many candidates as fit in its budget, and skips re-ranking altogether when
+    not even `topk` of them fit. Skipped or truncated requests fall back to the
+    FAISS order for the unscored tail. Skips decay the estimate, so after a slow
+    outlier (e.g. the cold first batch) a later request scores again and re-measures.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL_NAME, budget_ms: float = RERANK_BUDGET_MS):
+        self.model = CrossEncoder(model_name)
+        self.budget_ms = budget_ms
+        self._ms_per_pair: Optional[float] = None
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "skipped": 0, "truncated": 0, "total_ms": 0.0}
+
+    def rerank(self, query: str, candidates: List[Dict], topk: int = RERANK_TOPK,
+               budget_ms: Optional[float] = None) -> Tuple[List[Dict], Dict]:
+        budget = self.budget_ms if budget_ms is None else budget_ms
+        n = self._affordable(len(candidates), budget)
+        info = {"candidates": len(candidates), "scored": 0, "ms": 0.0, "budget_ms": budget}
+
+        self.stats["calls"] += 1
+        if n < min(topk, len(candidates)):
+            self.stats["skipped"] += 1
+            info["skipped"] = True
+            if budget > 0:
+                self._decay()
+            return candidates[:topk], info
+        if n < len(candidates):
+            self.stats["truncated"] += 1
+
+        started = time.perf_counter()
+        pairs = [(query, (c.get("text") or c.get("title") or "")[:MAX_TEXT_CHARS]) for c in candidates[:n]]
+        scores = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._observe(elapsed_ms / len(pairs))
+        self.stats["total_ms"] += elapsed_ms
+
+        ranked = [c for _, c in sorted(zip(scores, candidates[:n]), key=lambda sc: -float(sc[0]))]
+        info.update(scored=n, ms=round(elapsed_ms, 1), skipped=False)
+        return (ranked + candidates[n:])[:topk], info
+
+    def _affordable(self, n: int, budget_ms: float) -> int:
+        if budget_ms <= 0:
+            return 0
+        with self._lock:
+            per_pair = self._ms_per_pair
+        if per_pair is None:  # no estimate yet: score everything once to learn the cost
+            return n
+        return min(n, int(budget_ms / per_pair))
+
+    def _observe(self, ms_per_pair: float) -> None:
+        with self._lock:
+            if self._ms_per_pair is None:
+                self._ms_per_pair = ms_per_pair
+            else:
+                self._ms_per_pair = 0.8 * self._ms_per_pair + 0.2 * ms_per_pair
+
+    def _decay(self) -> None:
+        with self._lock:
+            if self._ms_per_pair is not None:
+                self._ms_per_pair *= SKIP_DECAY
@@ -1,56 +1,200 @@
 # router_agent.py
+import re
+import time
+import heapq
+import threading
 from typing import List, Dict
-from sqlalchemy.orm import Session
-from database import LawyerProfile, LawyerRecommendation, RecommendationStatus, Case
+
+import numpy as np
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session, object_session
+from database import LawyerProfile, LawyerRecommendation, RecommendationStatus, Case, User, UserRole
+
+ROSTER_TTL_SECS = 300  # also picks up profile edits made by other processes (seed_lawyers.py, admin DB edits)
+FALLBACK_ISSUE = "general_civil"
+
+_TERM_RE = re.compile(r"[a-z]+")
+_roster_generation = 0  # bumped after any committed profile change (listeners below, bulk imports)
+_generation_lock = threading.Lock()
+
+
+def _normalize_terms(text: str) -> List[str]:
+    """Lower-case words with a plural 's' dropped, plus adjacent-word bigrams for phrases like 'real estate'."""
+    words = [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+             for w in _TERM_RE.findall((text or "").lower())]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def invalidate_rosters(*_args) -> None:
+    """
+    Mark every LawyerRoster in this process stale. Called after commit by the
+    listeners below; Core bulk statements (lawyer_import.py) bypass those and
+    must call it themselves after committing.
+    """
+    global _roster_generation
+    with _generation_lock:
+        _roster_generation += 1
+
+
+def _mark_roster_dirty(mapper, connection, target) -> None:
+    # flush time is too early: a roster loaded before the commit would see the old rows
+    # under the new generation, so only note the change here and bump after commit
+    if isinstance(target, User) and target.role != UserRole.lawyer:
+        return  # client sign-ups / edits never touch the roster
+    session = object_session(target)
+    if session is not None:
+        session.info["roster_dirty"] = True
+
+
+def _after_commit(session) -> None:
+    if session.info.pop("roster_dirty", False):
+        invalidate_rosters()
+
+
+def _after_rollback(session) -> None:
+    session.info.pop("roster_dirty", None)
+
+
+for _evt in ("after_insert", "after_update", "after_delete"):
+    event.listen(LawyerProfile, _evt, _mark_roster_dirty)
+event.listen(User, "after_update", _mark_roster_dirty)  # lawyer names are shown in recommendations
+event.listen(Session, "after_commit", _after_commit)
+event.listen(Session, "after_rollback", _after_rollback)
+
+
+class LawyerRoster:
+    """
+    Available lawyers held in memory: an inverted index from normalised
+    specialization terms to row positions, and experience / rating as arrays,
+    so a match only touches the lawyers sharing a term with the issue.
+    Rebuilt lazily after any committed LawyerProfile insert/update/delete in this process
+    or after ROSTER_TTL_SECS.
+    """
+
+    def __init__(self, ttl: float = ROSTER_TTL_SECS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._generation = -1
+        self._loaded_at = 0.0
+        self.lawyers: List[Dict] = []
+        self.postings: Dict[str, np.ndarray] = {}
+        self.experience = np.zeros(0, dtype=np.float32)
+        self.rating = np.zeros(0, dtype=np.float32)
+        self.stats = {"loads": 0}
+
+    def invalidate(self) -> None:
+        self._generation = -1
+
+    def ensure_fresh(self, db: Session) -> None:
+        if self._generation == _roster_generation and time.time() - self._loaded_at < self.ttl:
+            return
+        with self._lock:
+            if self._generation == _roster_generation and time.time() - self._loaded_at < self.ttl:
+                return
+            generation = _roster_generation
+            self._load(db)
+            self._generation = generation
+            self._loaded_at = time.time()
+
+    def _load(self, db: Session) -> None:
+        rows = db.query(
+            LawyerProfile.id, User.name, LawyerProfile.specialization, LawyerProfile.city,
+            LawyerProfile.experience_years, LawyerProfile.rating
+        ).join(User, User.id == LawyerProfile.user_id).filter(
+            LawyerProfile.is_available == 1
+        ).order_by(LawyerProfile.id).all()
+
+        postings: Dict[str, List[int]] = {}
+        for pos, r in enumerate(rows):
+            for term in set(_normalize_terms(r.specialization)):
+                postings.setdefault(term, []).append(pos)
+        # swapped in together; a concurrent match keeps using the previous arrays
+        self.lawyers = [{
+            "lawyer_id": r.id,
+            "name": r.name,
+            "specialization": r.specialization,
+            "city": r.city,
+            "experience_years": r.experience_years,
+            "rating": r.rating or 0,
+        } for r in rows]
+        self.experience = np.array([r.experience_years or 0 for r in rows], dtype=np.float32)
+        self.rating = np.array([r.rating or 0 for r in rows], dtype=np.float32)
+        self.postings = {t: np.array(p, dtype=np.int64) for t, p in postings.items()}
+        self.stats["loads"] += 1
+
+    def match(self, keywords: List[str], limit: int) -> List[Dict]:
+        lawyers, postings, experience, rating = self.lawyers, self.postings, self.experience, self.rating
+        terms = {_normalize_terms(kw)[-1] for kw in keywords}  # last entry: the whole (bi)gram
+        hits = [postings[t] for t in terms if t in postings]
+        if not hits:
+            return []
+        rows, counts = np.unique(np.concatenate(hits), return_counts=True)
+        scores = counts * 20 + experience[rows] * 2 + rating[rows]
+        best = heapq.nlargest(limit, range(len(rows)), key=lambda i: (scores[i], -rows[i]))
+        return [{**lawyers[rows[i]], "score": int(scores[i])} for i in best]
+
 
 class RouterAgent:
     def __init__(self):
         self.specializations = {
             "property": ["property", "real estate", "land", "encroachment"],
             "family": ["family", "divorce", "matrimonial", "custody"],
-            "contract": ["contract", "construction", "commercial", "breach"]
+            "contract": ["contract", "construction", "commercial", "breach"],
+            "tenancy": ["tenancy", "rent", "rental", "landlord", "lease", "eviction", "property", "real estate"],
+            "consumer": ["consumer", "consumer protection", "insurance", "banking", "commercial"],
+            "tort": ["tort", "accident", "motor accident", "negligence", "compensation", "defamation"],
+            FALLBACK_ISSUE: ["civil", "property", "contract"],
         }
+        self.roster = LawyerRoster()
     
     def get_top_lawyers(self, db: Session, case_issue_type: str, limit: int = 5) -> List[Dict]:
-        """Match lawyers by specialization + availability."""
+        """Match lawyers by specialization + availability (general civil lawyers if nobody matches)."""
+        self.roster.ensure_fresh(db)
         spec_keywords = self.specializations.get(case_issue_type, [])
-        
-        lawyers = db.query(LawyerProfile).filter(
-            LawyerProfile.is_available == 1
-        ).all()
-        
-        scored = []
-        for lawyer in lawyers:
-            score = sum(1 for kw in spec_keywords if kw in (lawyer.specialization or "").lower())
-            if score > 0:
-                scored.append({
-                    "lawyer_id": lawyer.id,
-                    "name": lawyer.user.name,
-                    "specialization": lawyer.specialization,
-                    "city": lawyer.city,
-                    "experience_years": lawyer.experience_years,
-                    "rating": lawyer.rating or 0,
-                    "score": score * 20 + (lawyer.experience_years or 0) * 2 + (lawyer.rating or 0)
-                })
-        
-        return sorted(scored, key=lambda x: x["score"], reverse=True)[:limit]
+        matched = self.roster.match(spec_keywords, limit)
+        if not matched and case_issue_type != FALLBACK_ISSUE:
+            matched = self.roster.match(self.specializations[FALLBACK_ISSUE], limit)
+        return matched
     
     def create_recommendations(self, db: Session, case_id: int, lawyers: List[Dict]) -> List[int]:
-        """Create recommendation records in DB."""
+        """Create recommendation records in DB; ids come back in `lawyers` order."""
         case = db.query(Case).filter(Case.id == case_id).first()
         if not case:
             return []
         
-        rec_ids = []
-        for lawyer in lawyers:
-            rec = LawyerRecommendation(
-                case_id=case_id,
-                lawyer_id=lawyer["lawyer_id"],
-                score=lawyer["score"]
-            )
-            db.add(rec)
-            db.commit()
-            db.refresh(rec)
-            rec_ids.append(rec.id)
-        
-        return rec_ids
+        if not lawyers:
+            return []
+        # one INSERT ... RETURNING id in a single transaction
+        rows = [{
+            "case_id": case_id,
+            "lawyer_id": lawyer["lawyer_id"],
+            "score": lawyer["score"],
+            "status": RecommendationStatus.suggested,
+        } for lawyer in lawyers]
+        # batched into one INSERT by insertmanyvalues; RETURNING order is not guaranteed,
+        # so ids are matched back by lawyer
+        returned = db.execute(
+            insert(LawyerRecommendation).returning(LawyerRecommendation.id, LawyerRecommendation.lawyer_id),
+            rows,
+        ).all()
+        db.commit()
+        id_by_lawyer = {lawyer_id: rec_id for rec_id, lawyer_id in returned}
+        return [id_by_lawyer[lawyer["lawyer_id"]] for lawyer in lawyers]
+
+    def get_recommendations(self, db: Session, case_id: int) -> List[Dict]:
+        """Recommendations of a case with the lawyer fields the dashboard shows, in one query."""
+        rows = db.query(
+            LawyerRecommendation.id, LawyerRecommendation.score, User.name, LawyerProfile.specialization,
+            LawyerProfile.city, LawyerProfile.experience_years, LawyerProfile.rating
+        ).join(LawyerProfile, LawyerProfile.id == LawyerRecommendation.lawyer_id).join(
+            User, User.id == LawyerProfile.user_id
+        ).filter(LawyerRecommendation.case_id == case_id).order_by(LawyerRecommendation.id).all()
+        return [{
+            "rec_id": r.id,
+            "name": r.name,
+            "specialization": r.specialization,
+            "city": r.city,
+            "experience_years": r.experience_years,
+            "rating": r.rating or 0,
+            "score": r.score,
+        } for r in rows]
@@ -1,15 +1,12 @@
 # seed_lawyers.py - FIXED VERSION
-from database import init_db, get_db, User, LawyerProfile, UserRole
-from sqlalchemy.orm import Session
+from database import init_db, SessionLocal, LawyerProfile
+from lawyer_import import import_lawyers
 
 def seed_lawyers():
     # CREATE TABLES FIRST
     print("🔨 Creating database tables...")
     init_db()
     
-    db_gen = get_db()
-    db: Session = next(db_gen)
-    
     lawyers_data = [
         ("Rajesh Kumar", "property law, real estate", "Gurgaon", 12, 4),
         ("Priya Sharma", "family law, divorce", "Faridabad", 8, 5),
@@ -21,38 +18,18 @@ def seed_lawyers():
         ("Meera Joshi", "family custody", "Bhiwani", 11, 5),
     ]
     
-    seeded_count = 0
-    for name, spec, city, exp, rating in lawyers_data:
-        # Check if user exists
-        user = db.query(User).filter(User.name == name).first()
-        if not user:
-            user = User(
-                email=f"{name.lower().replace(' ', '.')}@lawyer.com",
-                name=name,
-                password_hash="dummyhash",
-                role=UserRole.lawyer
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-            print(f"✅ Created lawyer: {name}")
-        
-        # Add lawyer profile
-        profile = db.query(LawyerProfile).filter(LawyerProfile.user_id == user.id).first()
-        if not profile:
-            profile = LawyerProfile(
-                user_id=user.id,
-                specialization=spec,
-                city=city,
-                experience_years=exp,
-                rating=rating,
-                is_available=1
-            )
-            db.add(profile)
-            db.commit()
-            seeded_count += 1
+    # one transaction for all of them; existing lawyers (same email) are updated in place
+    totals = import_lawyers({
+        "name": name,
+        "specialization": spec,
+        "city": city,
+        "experience_years": exp,
+        "rating": rating,
+        "is_available": 1,
+    } for name, spec, city, exp, rating in lawyers_data)
     
-    print(f"🎉 Seeded {seeded_count} new lawyers!")
+    print(f"🎉 Seeded {totals['profiles_created']} new lawyers!")
+    db = SessionLocal()
     print("📊 Total lawyers:", db.query(LawyerProfile).count())
     db.close()
 
@@ -0,0 +1,258 @@
+# sharded_index.py - year/month partitioned FAISS index with parallel fan-out search
+import os
+import re
+import json
+import shutil
+import heapq
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from config_paths import FAISS_INDEX_PATH, META_JSONL, SHARD_DIR
+from vector_compression import exact_rerank, RERANK_OVERFETCH
+
+SHARD_INDEX_FILE = "index.faiss"
+SHARD_META_FILE = "meta.jsonl"  # metadata + chunk text, one line per vector
+SHARD_VECTORS_FILE = "vectors.f32"  # full-precision vectors of a compressed shard (raw float32, n x d)
+
+_SHARD_KEY_RE = re.compile(r"^(\d{4})_(\d{1,2})_")
+
+_search_pool: Optional[ThreadPoolExecutor] = None
+_search_pool_lock = threading.Lock()
+
+
+def get_search_pool(max_workers: Optional[int] = None) -> ThreadPoolExecutor:
+    """
+    Process-wide pool for shard fan-out. It outlives any one ShardedIndex, so a
+    search that started on an index version that has since been swapped out
+    can still finish.
+    """
+    global _search_pool
+    with _search_pool_lock:
+        if _search_pool is None:
+            # faiss releases the GIL inside search(), so threads give real parallelism
+            _search_pool = ThreadPoolExecutor(
+                max_workers=max_workers or min(8, os.cpu_count() or 1),
+                thread_name_prefix="shard-search",
+            )
+        return _search_pool
+
+
+def shard_key_for(filename: str) -> str:
+    """
+    Shard key from a judgment PDF name: 2024_1_18_36_EN.pdf -> "2024_01".
+    Names without a year/month prefix all land in the "misc" shard.
+    """
+    m = _SHARD_KEY_RE.match(filename)
+    if not m:
+        return "misc"
+    return f"{m.group(1)}_{int(m.group(2)):02d}"
+
+
+class Shard:
+    """
+    One FAISS index plus the metadata rows for its vectors (row i <-> vector i).
+    If the index is compressed, `vectors` (memory-mapped full-precision rows)
+    is used to re-rank an over-fetched candidate set exactly.
+    """
+
+    def __init__(self, name: str, index, metas: List[Dict], fingerprint: Optional[Tuple] = None,
+                 vectors: Optional[np.ndarray] = None):
+        if index.ntotal != len(metas):
+            raise ValueError(
+                f"Shard {name}: index has {index.ntotal} vectors but {len(metas)} metadata rows"
+            )
+        self.name = name
+        self.index = index
+        self.metas = metas
+        # identity of the files this shard was loaded from; lets a reload reuse it
+        self.fingerprint = fingerprint
+        self.vectors = vectors
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    @classmethod
+    def load(cls, path: Path) -> "Shard":
+        path = Path(path)
+        index = faiss.read_index(str(path / SHARD_INDEX_FILE))
+        metas = _read_jsonl(path / SHARD_META_FILE)
+        vectors = None
+        if (path / SHARD_VECTORS_FILE).exists():
+            vectors = np.memmap(path / SHARD_VECTORS_FILE, dtype="float32", mode="r").reshape(-1, index.d)
+        return cls(path.name, index, metas, fingerprint=shard_fingerprint(path), vectors=vectors)
+
+    def search(self, q_vecs, topk: int) -> List[Tuple[float, Dict]]:
+        if self.ntotal == 0:
+            return []
+        if self.vectors is not None:
+            D, I = self.index.search(q_vecs, min(topk * RERANK_OVERFETCH, self.ntotal))
+            dists, ids = exact_rerank(q_vecs[0], self.vectors, I[0], topk)
+            return [(float(dist), self.metas[idx]) for dist, idx in zip(dists, ids)]
+        D, I = self.index.search(q_vecs, min(topk, self.ntotal))
+        return [
+            (float(dist), self.metas[idx])
+            for dist, idx in zip(D[0], I[0])
+            if 0 <= idx < len(self.metas)
+        ]
+
+
+class ShardedIndex:
+    """
+    Set of independent shards searched in parallel; results are merged by L2 distance.
+
+    The shard mapping is replaced (never mutated) on add/remove, so a search that
+    is already running keeps working on the shards it started with.
+    `version` names the snapshot the shards were loaded from, if any.
+    """
+
+    def __init__(self, shards: Optional[Iterable[Shard]] = None, max_workers: Optional[int] = None,
+                 version: Optional[str] = None):
+        self._shards: Dict[str, Shard] = {s.name: s for s in (shards or [])}
+        self._pool = get_search_pool(max_workers)
+        self.version = version
+
+    @classmethod
+    def load(cls, shard_dir: Path = SHARD_DIR, **kwargs) -> "ShardedIndex":
+        return cls([Shard.load(p) for p in list_shard_dirs(shard_dir)], **kwargs)
+
+    @classmethod
+    def from_files(cls, index_path: Path = FAISS_INDEX_PATH, meta_path: Path = META_JSONL,
+                   name: str = "main", **kwargs) -> "ShardedIndex":
+        """Wrap the legacy monolithic faiss_civil.index + civil_meta.jsonl as a single shard."""
+        index = faiss.read_index(str(index_path))
+        return cls([Shard(name, index, _read_jsonl(meta_path))], **kwargs)
+
+    @property
+    def shards(self) -> List[Shard]:
+        return [self._shards[n] for n in sorted(self._shards)]
+
+    @property
+    def shard_names(self) -> List[str]:
+        return sorted(self._shards)
+
+    @property
+    def ntotal(self) -> int:
+        return sum(s.ntotal for s in self._shards.values())
+
+    def __len__(self) -> int:
+        return self.ntotal
+
+    def add_shard(self, shard: Shard) -> None:
+        """Add or replace a shard."""
+        shards = dict(self._shards)
+        shards[shard.name] = shard
+        self._shards = shards
+
+    def remove_shard(self, name: str) -> bool:
+        if name not in self._shards:
+            return False
+        shards = dict(self._shards)
+        del shards[name]
+        self._shards = shards
+        return True
+
+    def search(self, q_vecs, topk: int, shards: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Top-k metadata rows across the selected shards (all shards by default)."""
+        return [meta for _, meta in self.search_with_scores(q_vecs, topk, shards)]
+
+    def search_with_scores(self, q_vecs, topk: int,
+                           shards: Optional[Iterable[str]] = None) -> List[Tuple[float, Dict]]:
+        current = self._shards
+        targets = [current[n] for n in shards if n in current] if shards is not None else list(current.values())
+        if not targets:
+            return []
+        if len(targets) == 1:
+            hits = targets[0].search(q_vecs, topk)
+        else:
+            parts = self._pool.map(lambda s: s.search(q_vecs, topk), targets)
+            hits = [h for part in parts for h in part]
+        return heapq.nsmallest(topk, hits, key=lambda h: h[0])
+
+
+def list_shard_dirs(shard_dir: Path = SHARD_DIR) -> List[Path]:
+    shard_dir = Path(shard_dir)
+    if not shard_dir.exists():
+        return []
+    # ".<name>.tmp" / ".<name>.old" are leftovers of an interrupted rebuild, never shards
+    return sorted(
+        p for p in shard_dir.iterdir()
+        if p.is_dir() and not p.name.startswith(".")
+        and (p / SHARD_INDEX_FILE).exists() and (p / SHARD_META_FILE).exists()
+    )
+
+
+def shard_fingerprint(path: Path) -> Tuple:
+    """(inode, size, mtime) of the shard files; hard-linked copies share it."""
+    fp = []
+    for fname in (SHARD_INDEX_FILE, SHARD_META_FILE):
+        st = os.stat(Path(path) / fname)
+        fp.extend((st.st_ino, st.st_size, st.st_mtime_ns))
+    return tuple(fp)
+
+
+def write_shard(name: str, index, metas: List[Dict], shard_dir: Path = SHARD_DIR,
+                vectors: Optional[np.ndarray] = None) -> Path:
+    """
+    Write one shard. Files go to a temp dir first and are swapped in afterwards,
+    so a reader never sees an index from one build and metadata from another.
+    Pass `vectors` (full precision, index order) alongside a compressed index.
+    """
+    if index.ntotal != len(metas):
+        raise ValueError(f"Shard {name}: {index.ntotal} vectors vs {len(metas)} metadata rows")
+
+    shard_dir = Path(shard_dir)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    final = shard_dir / name
+    tmp = shard_dir / f".{name}.tmp"
+    old = shard_dir / f".{name}.old"
+    for p in (tmp, old):
+        if p.exists():
+            shutil.rmtree(p)
+
+    tmp.mkdir()
+    faiss.write_index(index, str(tmp / SHARD_INDEX_FILE))
+    with open(tmp / SHARD_META_FILE, "w", encoding="utf8") as f:
+        for m in metas:
+            f.write(json.dumps(m, ensure_ascii=False) + "\n")
+    if vectors is not None:
+        np.ascontiguousarray(vectors, dtype="float32").tofile(tmp / SHARD_VECTORS_FILE)
+
+    if final.exists():
+        final.rename(old)
+    tmp.rename(final)
+    if old.exists():
+        shutil.rmtree(old)
+    return final
+
+
+def delete_shard(name: str, shard_dir: Path = SHARD_DIR) -> bool:
+    path = Path(shard_dir) / name
+    if not path.exists():
+        return False
+    shutil.rmtree(path)
+    return True
+
+
+def load_index_store(max_workers: Optional[int] = None) -> ShardedIndex:
+    """Sharded layout if it has been built, else the legacy monolithic index as one shard."""
+    if list_shard_dirs(SHARD_DIR):
+        return ShardedIndex.load(SHARD_DIR, max_workers=max_workers)
+    if not os.path.exists(FAISS_INDEX_PATH):
+        raise FileNotFoundError("FAISS index not found. Run extract_and_index_civil.py first.")
+    return ShardedIndex.from_files(FAISS_INDEX_PATH, META_JSONL, max_workers=max_workers)
+
+
+def _read_jsonl(path: Path) -> List[Dict]:
+    rows = []
+    with open(path, "r", encoding="utf8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                rows.append(json.loads(line))
+    return rows
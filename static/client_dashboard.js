@@ -0,0 +1,152 @@
+// the page is static and cached; who is signed in comes from /me
+let CLIENT_ID = null;
+let currentCaseId = null;
+
+fetch('/me')
+    .then(r => {
+        if (r.status === 401) { window.location.href = '/'; throw new Error('Not authenticated'); }
+        return r.json();
+    })
+    .then(client => {
+        CLIENT_ID = client.id;
+        document.title = `LexConnect - ${client.name}'s Dashboard`;
+        document.querySelectorAll('[data-client]').forEach(el => {
+            el.textContent = client[el.dataset.client] ?? 'N/A';
+        });
+        return loadCases();
+    })
+    .catch(e => {
+        console.error('Cases error:', e);
+        document.getElementById('cases').innerHTML = '<p>🔄 Loading cases...</p>';
+    });
+
+// Load user's cases (one page at a time, 150-char previews)
+let casesLoaded = [];
+function loadCases(cursor) {
+    const after = cursor ? `&cursor=${cursor}` : '';
+    return fetch(`/cases?client_id=${CLIENT_ID}&preview=151${after}`)
+        .then(r => r.json())
+        .then(data => {
+            casesLoaded = cursor ? casesLoaded.concat(data.items) : data.items;
+            showCases(casesLoaded, data.next_cursor);
+        });
+}
+
+function showCases(cases, nextCursor) {
+    const div = document.getElementById('cases');
+    if (!cases || cases.length === 0) {
+        div.innerHTML = `
+            <div class="case-card" style="border-left-color: #ffc107;">
+                <h4>📭 No cases yet</h4>
+                <p>Create your first case using the blue form above!</p>
+                <button onclick="createSampleCase()" style="background: #ffc107; color: #856404;">✨ Create Sample Case</button>
+            </div>
+        `;
+        return;
+    }
+    div.innerHTML = cases.map(c => `
+        <div class="case-card">
+            <h4>${c.issue_type.toUpperCase()} Case #${c.id}</h4>
+            <p>${c.description.substring(0,150)}${c.description.length>150?'...':''}</p>
+            <button onclick="loadRecommendations(${c.id})">👨‍⚖️ Get Lawyer Recommendations</button>
+        </div>
+    `).join('') + (nextCursor ? `<button onclick="loadCases(${nextCursor})">⬇️ Load more cases</button>` : '');
+}
+
+function createNewCase() {
+    const text = document.getElementById('new-case-text').value.trim();
+    if (!text) {
+        alert('⚠️ Please describe your legal problem!');
+        return;
+    }
+
+    const btn = event.target;
+    const originalText = btn.innerHTML;
+    btn.innerHTML = '⏳ Creating...';
+    btn.disabled = true;
+
+    fetch('/caseintake', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({case_text: text, client_id: CLIENT_ID})
+    })
+    .then(r => r.json())
+    .then(data => {
+        alert(`✅ SUCCESS! ${data.issue_type.toUpperCase()} Case #${data.case_id} created`);
+        document.getElementById('new-case-text').value = '';
+        btn.innerHTML = originalText;
+        btn.disabled = false;
+        loadCases();
+    })
+    .catch(e => {
+        alert('❌ Error: ' + e.message);
+        btn.innerHTML = originalText;
+        btn.disabled = false;
+    });
+}
+
+function createSampleCase() {
+    document.getElementById('new-case-text').value = "Contractor took ₹25 lakhs advance for house construction in Gurugram but stopped after foundation. Now demanding more money. Need legal remedy.";
+    createNewCase();
+}
+
+function loadRecommendations(caseId) {
+    currentCaseId = caseId;
+    document.getElementById('recommendations').innerHTML = '🔍 AI matching lawyers...';
+    fetch(`/cases/${caseId}/recommendations`, {method: 'POST'})
+        .then(r => r.json())
+        .then(showRecommendations);
+}
+
+function showRecommendations(data) {
+    const div = document.getElementById('recommendations');
+    if (data.status === 'pending') {
+        div.innerHTML = '⏳ Still matching lawyers for this case... try again in a few seconds.';
+        return;
+    }
+    div.innerHTML = data.recommendations.map((r, i) => `
+        <div class="lawyer-card">
+            <h4><strong>${r.name}</strong></h4>
+            <p><strong>${r.specialization}</strong> | ${r.city} | ${r.experience_years} yrs | ⭐${r.rating}</p>
+            <p><strong>Match Score: ${r.score}/100</strong></p>
+            <button onclick="acceptLawyer(${data.rec_ids[i]})" style="background: #28a745;">✅ Accept Lawyer</button>
+        </div>
+    `).join('');
+}
+
+function acceptLawyer(recId) {
+    fetch(`/recommendations/${recId}/client-accept`, {method: 'POST'})
+        .then(() => alert('✅ Lawyer accepted!'));
+}
+
+function sendMessage() {
+    const msg = document.getElementById('message').value.trim();
+    if (!msg) return;
+    addMessage('You', msg);
+    document.getElementById('message').value = '';
+
+    fetch('/chat', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({
+            message: msg,
+            use_case_context: document.getElementById('use-context').checked,
+            case_id: currentCaseId
+        })
+    })
+    .then(r => r.json())
+    .then(addMessage.bind(null, 'LexConnect AI'));
+}
+
+function addMessage(sender, data) {
+    const chat = document.getElementById('chat');
+    const div = document.createElement('div');
+    div.style.marginBottom = '20px';
+    div.innerHTML = `<div style="font-weight: 600; color: ${sender === 'You' ? '#1976d2' : '#28a745'};">${sender}</div><div>${typeof data === 'string' ? data : data.answer}</div>`;
+    chat.appendChild(div);
+    chat.scrollTop = chat.scrollHeight;
+}
+
+function logout() {
+    fetch('/logout', {method: 'POST'}).finally(() => window.location.href = '/');
+}
@@ -0,0 +1,70 @@
+const LAWYER_ID = 1;
+
+const PREVIEW_CHARS = 300;
+let requests = [], active = [];
+
+function load(){
+    loadRequests();
+    loadActive();
+}
+
+function loadRequests(cursor){
+    fetch(`/lawyer/requests?lawyer_id=${LAWYER_ID}&preview=${PREVIEW_CHARS + 1}${cursor ? '&cursor=' + cursor : ''}`)
+        .then(r=>r.json())
+        .then(page=>{ requests = cursor ? requests.concat(page.items) : page.items; showRequests(requests, page.next_cursor); });
+}
+
+function loadActive(cursor){
+    fetch(`/lawyer/active-cases?lawyer_id=${LAWYER_ID}&preview=${PREVIEW_CHARS + 1}${cursor ? '&cursor=' + cursor : ''}`)
+        .then(r=>r.json())
+        .then(page=>{ active = cursor ? active.concat(page.items) : page.items; showActive(active, page.next_cursor); });
+}
+
+function moreButton(fn, cursor){
+    return cursor ? `<button onclick="${fn}(${cursor})">Load more</button>` : '';
+}
+
+function showRequests(data, nextCursor){
+    const div = document.getElementById('requests');
+    if(!data?.length){
+        div.innerHTML = '<div class="case-card">📭 No pending requests</div>';
+        return;
+    }
+
+    div.innerHTML = data.map(r=>`
+        <div class="case-card">
+            <h4>${r.issue_type.toUpperCase()} Case #${r.case_id}</h4>
+            <p>${r.description.slice(0, PREVIEW_CHARS)}${r.description.length > PREVIEW_CHARS ? '…' : ''}</p>
+            <button class="accept" onclick="accept(${r.rec_id})">Accept</button>
+            <button class="decline" onclick="decline(${r.rec_id})">Decline</button>
+        </div>
+    `).join('') + moreButton('loadRequests', nextCursor);
+}
+
+function showActive(data, nextCursor){
+    const div = document.getElementById('active');
+    if(!data?.length){
+        div.innerHTML = '<div class="case-card">⚠ No active cases</div>';
+        return;
+    }
+
+    div.innerHTML = data.map(c=>`
+        <div class="case-card">
+            <h4>${c.issue_type.toUpperCase()} Case #${c.case_id}</h4>
+            <p>${c.description.slice(0, PREVIEW_CHARS)}${c.description.length > PREVIEW_CHARS ? '…' : ''}</p>
+            <span style="color:#28a745;font-weight:600;">ACTIVE</span>
+        </div>
+    `).join('') + moreButton('loadActive', nextCursor);
+}
+
+function accept(id){
+    fetch(`/recommendations/${id}/lawyer-accept`, {method:'POST'})
+        .then(load);
+}
+
+function decline(id){
+    fetch(`/recommendations/${id}/decline`, {method:'POST'})
+        .then(load);
+}
+
+load();
@@ -0,0 +1,72 @@
+let isRegister = true;
+
+function toggleForm() {
+    isRegister = !isRegister;
+    document.getElementById('registerForm').style.display = isRegister ? 'block' : 'none';
+    document.getElementById('loginForm').style.display = isRegister ? 'none' : 'block';
+    document.getElementById('toggleText').textContent = isRegister ? 'login' : 'register';
+}
+
+function showError(msg) {
+    const errorDiv = document.getElementById('errorMsg');
+    errorDiv.textContent = msg;
+    errorDiv.style.display = 'block';
+    errorDiv.scrollIntoView({ behavior: 'smooth' });
+    setTimeout(() => errorDiv.style.display = 'none', 5000);
+}
+
+async function handleSubmit(e) {
+    e.preventDefault();
+    const form = e.target;
+    const formData = new FormData(form);
+    const submitBtn = form.querySelector('button[type="submit"]');
+    const originalText = submitBtn.innerHTML;
+
+    // Loading state
+    submitBtn.innerHTML = '⏳ Processing...';
+    submitBtn.disabled = true;
+
+    try {
+        const endpoint = form.id.includes('register') ? '/register' : '/login';
+        const res = await fetch(endpoint, {
+            method: 'POST',
+            body: formData
+        });
+
+        // Handle both JSON and text responses
+        let result;
+        try {
+            result = await res.json();
+        } catch {
+            result = {detail: await res.text()};
+        }
+
+        if (res.ok && result.success) {
+            window.location.href = '/dashboard';  // session cookie set by the response
+        } else {
+            showError(result.detail || 'Unknown error');
+        }
+    } catch(e) {
+        showError('Network error: ' + e.message);
+    } finally {
+        submitBtn.innerHTML = originalText;
+        submitBtn.disabled = false;
+    }
+}
+
+function demoRegister() {
+    document.querySelector('#registerForm input[name="name"]').value = 'Demo User';
+    document.querySelector('#registerForm input[name="email"]').value = 'demo' + Date.now() + '@lexconnect.com';
+    document.querySelector('#registerForm input[name="phone"]').value = '9876543210';
+    document.getElementById('registerForm').dispatchEvent(new Event('submit'));
+}
+
+function demoLogin() {
+    document.querySelector('#loginForm input[name="email"]').value = 'test@test.com';
+    toggleForm();
+    document.getElementById('loginForm').dispatchEvent(new Event('submit'));
+}
+
+// Form event listeners
+document.getElementById('registerForm').addEventListener('submit', handleSubmit);
+document.getElementById('loginForm').addEventListener('submit', handleSubmit);
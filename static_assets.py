@@ -0,0 +1,129 @@
+# static_assets.py - pages + assets from static/, precompressed at startup, strong ETags and long-lived caching
+import gzip
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+ASSET_MAX_AGE_SECS = 31536000    # versioned asset URLs never change content
+MIN_COMPRESS_BYTES = 256
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".json": "application/json",
+    ".svg": "image/svg+xml",
+    ".png": "image/png",
+    ".ico": "image/x-icon",
+}
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".svg"}
+_ASSET_REF = re.compile(r'(["\'])/static/([\w.-]+)\1')
+
+
+class Asset:
+    def __init__(self, name: str, body: bytes):
+        self.name = name
+        self.content_type = CONTENT_TYPES.get(Path(name).suffix, "application/octet-stream")
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        # one representation per content-coding, each with its own strong ETag
+        self.bodies: Dict[str, bytes] = {"identity": body}
+        if Path(name).suffix in COMPRESSIBLE and len(body) >= MIN_COMPRESS_BYTES:
+            self.bodies["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(body, quality=11)
+
+    def etag(self, coding: str) -> str:
+        return f'"{self.version}"' if coding == "identity" else f'"{self.version}-{coding}"'
+
+
+class StaticAssets:
+    """
+    Everything under static/ is read, fingerprinted and compressed (gzip, plus
+    brotli when installed) once at startup, so serving a page is a dict lookup.
+
+    Pages refer to their CSS/JS as "/static/<name>"; those references are
+    rewritten to "/static/<name>?v=<content hash>" and such versioned URLs are
+    cached for a year. The pages themselves keep fixed URLs, so they are sent
+    with `no-cache`: browsers revalidate every load and get a 304 while the
+    ETag still matches.
+    """
+
+    def __init__(self, directory: Path = STATIC_DIR):
+        self.directory = Path(directory)
+        self.assets: Dict[str, Asset] = {}
+        self.load()
+
+    def load(self) -> None:
+        files = sorted(p for p in self.directory.iterdir() if p.is_file())
+        assets = {p.name: Asset(p.name, p.read_bytes()) for p in files if p.suffix != ".html"}
+        for p in files:
+            if p.suffix == ".html":
+                html = _ASSET_REF.sub(lambda m: self._versioned(m, assets), p.read_text(encoding="utf8"))
+                assets[p.name] = Asset(p.name, html.encode("utf8"))
+        self.assets = assets
+        raw = sum(len(a.bodies["identity"]) for a in assets.values())
+        print(f"✅ Static assets ready: {len(assets)} files, {raw / 1024:.0f} KB "
+              f"({'gzip + brotli' if brotli else 'gzip'})")
+
+    @staticmethod
+    def _versioned(m, assets: Dict[str, Asset]) -> str:
+        asset = assets.get(m.group(2))
+        if asset is None:
+            return m.group(0)
+        return f"{m.group(1)}/static/{asset.name}?v={asset.version}{m.group(1)}"
+
+    def response(self, request: Request, name: str, version: Optional[str] = None) -> Response:
+        asset = self.assets.get(name)
+        if asset is None:
+            return Response(status_code=404)
+        coding = _pick_coding(request.headers.get("accept-encoding", ""), asset.bodies)
+        etag = asset.etag(coding)
+        immutable = version is not None and version == asset.version
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={ASSET_MAX_AGE_SECS}, immutable" if immutable else "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(asset.bodies[coding], media_type=asset.content_type, headers=headers)
+
+    def status(self) -> Dict:
+        return {name: {k: len(v) for k, v in a.bodies.items()} for name, a in self.assets.items()}
+
+
+def _pick_coding(accept_encoding: str, available: Dict[str, bytes]) -> str:
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding)
+    for coding in ("br", "gzip"):
+        if coding in available and (coding in accepted or "*" in accepted):
+            return coding
+    return "identity"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison, as RFC 9110 prescribes for If-None-Match
+    return etag in (t.strip().removeprefix("W/") for t in if_none_match.split(","))
+
+
+if __name__ == "__main__":
+    for name, sizes in StaticAssets().status().items():
+        print(f"📦 {name}: " + ", ".join(f"{k} {v} B" for k, v in sizes.items()))
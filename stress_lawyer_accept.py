@@ -0,0 +1,85 @@
+# stress_lawyer_accept.py - parallel lawyer accepts of the same recommendations must yield one ActiveCase each
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, Case, LawyerRecommendation, ActiveCase, RecommendationStatus
+from lawyer_agent import LawyerAgent
+
+
+def legacy_accept(db, rec_id):
+    """accept_case before conditional updates: read, mutate in Python, insert, commit."""
+    rec = db.query(LawyerRecommendation).filter(LawyerRecommendation.id == rec_id).first()
+    if not rec:
+        return None
+    time.sleep(0.001)  # the window between read and write that real request handling has
+    rec.status = RecommendationStatus.lawyer_accepted
+    active = ActiveCase(case_id=rec.case_id, lawyer_id=rec.lawyer_id)
+    db.add(active)
+    db.commit()
+    return active
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent accept stress test for LawyerAgent.accept_case.")
+    parser.add_argument("--recs", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8, help="threads racing to accept every recommendation")
+    parser.add_argument("--legacy", action="store_true", help="run the old read-modify-write accept instead")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "stress.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        case = Case(client_id=1, issue_type="property", description="stress")
+        db.add(case)
+        db.flush()
+        db.add_all([LawyerRecommendation(case_id=case.id, lawyer_id=1 + i % 10, score=50,
+                                         status=RecommendationStatus.client_accepted) for i in range(args.recs)])
+        db.commit()
+        rec_ids = [r for (r,) in db.query(LawyerRecommendation.id)]
+
+    agent = LawyerAgent()
+    accept = legacy_accept if args.legacy else agent.accept_case
+    wins = Counter()
+    errors = []
+    barrier = threading.Barrier(args.threads)
+
+    def worker():
+        barrier.wait()
+        for rec_id in rec_ids:
+            with Session() as db:
+                try:
+                    if accept(db, rec_id) is not None:
+                        wins[rec_id] += 1
+                except Exception as e:
+                    errors.append(repr(e))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    with Session() as db:
+        total_active = db.query(ActiveCase).count()
+    duplicates = sum(1 for n in wins.values() if n > 1)
+    print(f"⏱️ {args.threads} threads x {len(rec_ids)} accepts in {elapsed:.2f}s "
+          f"({'legacy' if args.legacy else 'conditional UPDATE'})")
+    print(f"📊 active cases: {total_active} for {len(rec_ids)} recommendations, "
+          f"recommendations accepted more than once: {duplicates}, errors: {len(errors)}")
+    for e in errors[:3]:
+        print(f"   ⚠️ {e}")
+    ok = total_active == len(rec_ids) and duplicates == 0
+    print("✅ no duplicate active cases" if ok else "❌ duplicate or missing active cases")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,136 @@
+# vector_compression.py - PCA / scalar / binary compressed shard indexes + memory/recall report
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import faiss
+import numpy as np
+
+from config_paths import SHARD_DIR, SNAPSHOT_DIR
+
+# --compress accepts these shorthands or any faiss index_factory string
+COMPRESSION_ALIASES = {
+    "sq8": "SQ8",                 # 8-bit scalar quantization: 4x smaller
+    "pca128": "PCA128,Flat",      # 384 -> 128 dims: 3x smaller
+    "pca128-sq8": "PCA128,SQ8",   # both: 12x smaller
+    "binary": "LSHrt",            # 1 bit per dim after a random rotation: 32x smaller
+}
+MIN_TRAIN_VECTORS = 256  # smaller shards stay IndexFlatL2
+RERANK_OVERFETCH = 4     # compressed search fetches topk * this many candidates for exact re-rank
+
+
+def compression_spec(name: Optional[str]) -> Optional[str]:
+    if not name or name.lower() in {"none", "flat"}:
+        return None
+    return COMPRESSION_ALIASES.get(name.lower(), name)
+
+
+def build_compressed_index(vectors: np.ndarray, spec: str):
+    """Train + fill a compressed index; tiny shards fall back to an exact IndexFlatL2."""
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    if len(vectors) < MIN_TRAIN_VECTORS:
+        index = faiss.IndexFlatL2(vectors.shape[1])
+    else:
+        index = faiss.index_factory(vectors.shape[1], spec)
+        if not index.is_trained:
+            index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def exact_rerank(q_vec: np.ndarray, vectors: np.ndarray, ids: np.ndarray, topk: int):
+    """Exact squared L2 of candidates `ids` (rows of the full-precision `vectors`); best topk first."""
+    ids = np.sort(ids[ids >= 0])  # sorted rows read the memory-mapped file sequentially
+    if len(ids) == 0:
+        return np.empty(0, dtype="float32"), ids
+    cand = np.asarray(vectors[ids], dtype="float32")
+    dists = ((cand - q_vec.reshape(1, -1)) ** 2).sum(axis=1)
+    order = np.argsort(dists)[:topk]
+    return dists[order], ids[order]
+
+
+def index_bytes_per_vector(index) -> float:
+    try:
+        return float(index.sa_code_size())
+    except RuntimeError:
+        return 4.0 * index.d
+
+
+def compression_report(vectors: np.ndarray, spec: str, n_queries: int = 200, topk: int = 5,
+                       seed: int = 0) -> Dict:
+    """
+    Memory per million chunks and recall@topk of `spec` against IndexFlatL2,
+    with and without exact re-ranking. Queries are vectors sampled from the
+    indexed corpus itself (each is its own nearest neighbour), not held out.
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    q_ids = rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+    queries = vectors[q_ids]
+
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    _, truth = flat.search(queries, topk + 1)
+    truth = truth[:, 1:]  # drop the query vector itself
+
+    started = time.perf_counter()
+    comp = build_compressed_index(vectors, spec)
+    build_s = time.perf_counter() - started
+
+    def recall(found):
+        return float(np.mean([len(set(f) & set(t)) / topk for f, t in zip(found, truth)]))
+
+    _, raw = comp.search(queries, topk + 1)
+    raw_recall = recall([[i for i in row if i != qi][:topk] for row, qi in zip(raw, q_ids)])
+
+    _, cand = comp.search(queries, topk * RERANK_OVERFETCH + 1)
+    reranked = []
+    for q, row, qi in zip(queries, cand, q_ids):
+        _, ids = exact_rerank(q, vectors, row[row != qi], topk)
+        reranked.append(list(ids))
+    rerank_recall = recall(reranked)
+
+    flat_b = 4.0 * vectors.shape[1]
+    comp_b = index_bytes_per_vector(comp)
+    return {
+        "spec": spec,
+        "vectors": len(vectors),
+        "build_seconds": round(build_s, 2),
+        "flat_mb_per_million": round(flat_b * 1e6 / 2**20, 1),
+        "compressed_mb_per_million": round(comp_b * 1e6 / 2**20, 1),
+        "compression_ratio": round(flat_b / comp_b, 1),
+        f"recall@{topk}": round(raw_recall, 3),
+        f"recall@{topk}_reranked": round(rerank_recall, 3),
+    }
+
+
+def _load_shard_vectors(shard_path: Path) -> np.ndarray:
+    from sharded_index import Shard
+    shard = Shard.load(shard_path)
+    if shard.vectors is not None:
+        return np.asarray(shard.vectors)
+    if isinstance(shard.index, faiss.IndexFlat):
+        return shard.index.reconstruct_n(0, shard.ntotal)
+    raise ValueError(f"{shard_path} has neither a flat index nor a full-precision side file")
+
+
+if __name__ == "__main__":
+    from index_snapshots import current_version
+
+    parser = argparse.ArgumentParser(description="Memory / recall report for compressed shard indexes.")
+    parser.add_argument("--shard", required=True,
+                        help="shard of the live snapshot (or of the unversioned shard dir) to sample, e.g. 2024_10")
+    parser.add_argument("--compress", nargs="+", default=list(COMPRESSION_ALIASES))
+    parser.add_argument("--topk", type=int, default=5)
+    args = parser.parse_args()
+
+    version = current_version()
+    shard_path = (SNAPSHOT_DIR / version if version else SHARD_DIR) / args.shard
+    if not shard_path.is_dir():
+        raise SystemExit(f"❌ Shard {args.shard} not found in {shard_path.parent}"
+                         f"{'' if version else ' (no snapshot published yet)'}")
+    vecs = _load_shard_vectors(shard_path)
+    print(f"{len(vecs)} vectors x {vecs.shape[1]} dims from shard {args.shard}")
+    for name in args.compress:
+        print(compression_report(vecs, compression_spec(name), topk=args.topk))